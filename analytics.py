@@ -0,0 +1,140 @@
+import argparse
+import csv
+import os
+import multiprocessing
+from collections import Counter, deque
+
+from app._class.Grid import LogicGrid
+from app._class.GameArchive import GameArchive
+
+OPENING_LENGTH = 4
+COLUMNS = 'ABCDEFGH'
+
+
+def move_name(x, y):
+    """Names a move like the columns/rows of print_logic_board, e.g. D2."""
+    return f"{COLUMNS[x]}{y}"
+
+
+class GameStats:
+    """Aggregated statistics of a set of games; partial results are merged with `merge`."""
+    def __init__(self):
+        self.games = 0
+        self.invalid = 0
+        self.openings = Counter()
+        self.first_moves = Counter()
+        self.results = Counter()  # (first move, winner)
+        self.lengths = Counter()
+        self.mobility_total = Counter()  # ply -> summed mobility of the side to move
+        self.mobility_count = Counter()
+
+    def merge(self, other):
+        self.games += other.games
+        self.invalid += other.invalid
+        for name in ('openings', 'first_moves', 'results', 'lengths', 'mobility_total', 'mobility_count'):
+            getattr(self, name).update(getattr(other, name))
+        return self
+
+
+def replay(grid, moves):
+    """
+    Replays a game with the server rules, returning the mobility of the side to
+    move before each ply and the winner (1, -1 or 0), or None if a move is illegal.
+    """
+    board = grid.generate_grid(grid.num_rows, grid.num_columns)
+    turn = -1
+    mobility = []
+    for x, y in moves:
+        available_moves = grid.find_available_moves(board, turn)
+        if (y, x) not in available_moves:
+            return None, None
+        mobility.append(len(available_moves))
+        grid.insert_token(board, turn, y, x)
+        for tile in grid.get_swappable_tiles(y, x, board, turn):
+            grid.flip_token(board, tile[0], tile[1])
+        turn *= -1
+
+    white = sum(row.count(1) for row in board)
+    black = sum(row.count(-1) for row in board)
+    return mobility, (white > black) - (white < black)
+
+
+def analyze_chunk(games):
+    grid = LogicGrid(8, 8)
+    stats = GameStats()
+    for moves in games:
+        mobility, winner = replay(grid, moves)
+        if mobility is None:
+            stats.invalid += 1
+            continue
+        stats.games += 1
+        names = [move_name(x, y) for x, y in moves]
+        first_move = names[0] if names else '-'
+        stats.openings[' '.join(names[:OPENING_LENGTH])] += 1
+        stats.first_moves[first_move] += 1
+        stats.results[(first_move, winner)] += 1
+        stats.lengths[len(moves)] += 1
+        for ply, count in enumerate(mobility):
+            stats.mobility_total[ply] += count
+            stats.mobility_count[ply] += 1
+    return stats
+
+
+def analyze(paths, workers=None, chunk_size=2000):
+    """
+    Streams the archives through a process pool, keeping at most two chunks per
+    worker in flight so memory stays constant whatever the archive size.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = GameStats()
+    with multiprocessing.Pool(workers) as pool:
+        in_flight = deque()
+        for chunk in GameArchive.read_chunks(paths, chunk_size):
+            in_flight.append(pool.apply_async(analyze_chunk, (chunk,)))
+            if len(in_flight) >= workers * 2:
+                stats.merge(in_flight.popleft().get())
+        while in_flight:
+            stats.merge(in_flight.popleft().get())
+    return stats
+
+
+def write_table(path, header, rows):
+    with open(path, 'w', newline='') as table:
+        writer = csv.writer(table)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_summary(stats, output_dir, top=100):
+    os.makedirs(output_dir, exist_ok=True)
+
+    write_table(os.path.join(output_dir, 'openings.csv'), ['opening', 'games', 'share'],
+                [(opening, count, round(count / stats.games, 4)) for opening, count in stats.openings.most_common(top)])
+
+    write_table(os.path.join(output_dir, 'first_moves.csv'), ['first_move', 'games', 'black_wins', 'white_wins', 'draws', 'black_win_rate'],
+                [(move, count, stats.results[(move, -1)], stats.results[(move, 1)], stats.results[(move, 0)],
+                  round(stats.results[(move, -1)] / count, 4)) for move, count in stats.first_moves.most_common()])
+
+    average = sum(length * count for length, count in stats.lengths.items()) / stats.games
+    write_table(os.path.join(output_dir, 'lengths.csv'), ['length', 'games'],
+                sorted(stats.lengths.items()) + [('average', round(average, 2))])
+
+    write_table(os.path.join(output_dir, 'mobility.csv'), ['ply', 'average_mobility', 'games'],
+                [(ply, round(stats.mobility_total[ply] / stats.mobility_count[ply], 3), stats.mobility_count[ply])
+                 for ply in sorted(stats.mobility_count)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate statistics over game archives written by the server.")
+    parser.add_argument('archives', nargs='+', help="archive files written with server.py --archive")
+    parser.add_argument('--out', default='summary', help="directory for the summary tables")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=2000, help="games per task sent to a worker")
+    args = parser.parse_args()
+
+    stats = analyze(args.archives, args.workers, args.chunk_size)
+    if not stats.games:
+        print("No valid games found.")
+    else:
+        write_summary(stats, args.out)
+        print(f"{stats.games} games analyzed ({stats.invalid} invalid), tables written to {args.out}/")
@@ -0,0 +1,109 @@
+import os
+from types import SimpleNamespace
+
+# Sem janela: precisa ser definido antes de o pygame iniciar o vídeo
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+# Sem isso o SDL captura o SIGTERM e processos de um Pool não podem ser encerrados
+os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+
+import pygame
+
+from app._class.Grid import DrawableGrid, LogicGrid
+
+
+class BoardRenderer:
+    """
+    Draws boards without a window, with the same assets as the client.
+
+    The background and token surfaces are loaded once by a DrawableGrid
+    (attached to a stub game, since nothing is animated) and reused for
+    every image. Games are rendered incrementally: each frame only repaints
+    the cells that changed since the previous one.
+    """
+    BOARD_SIZE = 800
+    CELL_SIZE = 80
+    OFFSET = 80
+
+    def __init__(self, size=BOARD_SIZE):
+        pygame.display.init()
+        if pygame.display.get_surface() is None:
+            # convert_alpha precisa de um modo de vídeo, mesmo com o driver dummy
+            pygame.display.set_mode((1, 1))
+        self.size = size
+        self.grid = DrawableGrid(8, 8, (self.CELL_SIZE, self.CELL_SIZE), SimpleNamespace(turn=0, current_player=0))
+        self.background = self.grid.background_image.subsurface((0, 0, self.BOARD_SIZE, self.BOARD_SIZE)).copy()
+        self.token_images = {1: self.grid.white_token_image, -1: self.grid.black_token_image}
+        self.surface = self.background.copy()
+        self.cells = [[0] * 8 for _ in range(8)]
+
+    def cell_rect(self, y, x):
+        return pygame.Rect(self.OFFSET + x * self.CELL_SIZE, self.OFFSET + y * self.CELL_SIZE,
+                           self.CELL_SIZE, self.CELL_SIZE)
+
+    def draw(self, logic_grid):
+        """Brings the working surface to `logic_grid`, repainting only the cells that differ."""
+        for y, row in enumerate(logic_grid):
+            for x, player in enumerate(row):
+                if self.cells[y][x] == player:
+                    continue
+                rect = self.cell_rect(y, x)
+                self.surface.blit(self.background, rect, rect)
+                if player:
+                    self.surface.blit(self.token_images[player], rect)
+                self.cells[y][x] = player
+        return self.surface
+
+    def snapshot(self):
+        """A copy of the working surface at the output size."""
+        if self.size == self.BOARD_SIZE:
+            return self.surface.copy()
+        return pygame.transform.smoothscale(self.surface, (self.size, self.size))
+
+    def render(self, logic_grid):
+        """Renders one position, given as an 8x8 logic grid, to a new surface."""
+        self.draw(logic_grid)
+        return self.snapshot()
+
+    @staticmethod
+    def replay(moves):
+        """
+        Yields the logic grid after each (x, y) move, starting with the initial
+        board. Stops early at an illegal move.
+        """
+        rules = LogicGrid(8, 8)
+        board = rules.logic_grid
+        turn = -1
+        yield board
+        for x, y in moves:
+            if (y, x) not in rules.find_available_moves(board, turn):
+                return
+            rules.insert_token(board, turn, y, x)
+            for tile in rules.get_swappable_tiles(y, x, board, turn):
+                rules.flip_token(board, tile[0], tile[1])
+            turn *= -1
+            yield board
+
+    def render_game(self, moves):
+        """Yields one surface per position of a game given as (x, y) moves."""
+        for board in self.replay(moves):
+            yield self.render(board)
+
+    def save_position(self, logic_grid, path):
+        pygame.image.save(self.render(logic_grid), path)
+
+    def save_game(self, moves, prefix):
+        """
+        Writes the game as numbered PNG frames `<prefix>-000.png`, ... (pygame
+        cannot encode animated images; the frames can be joined with any
+        encoder) and returns how many were written.
+        """
+        count = 0
+        for count, frame in enumerate(self.render_game(moves), 1):
+            pygame.image.save(frame, f"{prefix}-{count - 1:03d}.png")
+        return count
+
+    def save_final_position(self, moves, path):
+        """Writes the last position of the game, e.g. as a thumbnail."""
+        for board in self.replay(moves):
+            pass
+        self.save_position(board, path)
@@ -0,0 +1,62 @@
+import os
+from itertools import islice
+
+
+class GameArchive:
+    """
+    Append-only file of finished games.
+
+    The file starts with MAGIC; each game is one length byte followed by one
+    byte per move holding `y * 8 + x`, with x and y as in the MOVE payload.
+    Every game is written with a single append, so several rooms (and several
+    server processes) can share one archive.
+    """
+    MAGIC = b'OTHA\x01'
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'ab') as archive:
+                if archive.tell() == 0:
+                    archive.write(self.MAGIC)
+
+    @staticmethod
+    def encode(moves):
+        if len(moves) > 255:
+            raise ValueError("A game cannot have more than 255 moves")
+        return bytes([len(moves)] + [y * 8 + x for x, y in moves])
+
+    def append(self, moves):
+        """Stores a finished game given as a list of (x, y) moves."""
+        record = self.encode(moves)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, record)
+        finally:
+            os.close(fd)
+
+    @classmethod
+    def read_games(cls, path, buffer_size=1 << 16):
+        """
+        Yields each game of the archive as a list of (x, y) moves, reading the
+        file in fixed-size chunks so memory use does not grow with its size.
+        """
+        with open(path, 'rb', buffering=buffer_size) as archive:
+            if archive.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not a game archive")
+            while header := archive.read(1):
+                data = archive.read(header[0])
+                if len(data) != header[0]:
+                    raise ValueError(f"Truncated game at the end of {path}")
+                yield [(square % 8, square // 8) for square in data]
+
+    @classmethod
+    def read_chunks(cls, paths, chunk_size):
+        """
+        Yields the games of every archive in `paths` as lists of at most
+        `chunk_size` games, the unit of work handed to a process pool.
+        """
+        for path in paths:
+            games = cls.read_games(path)
+            while chunk := list(islice(games, chunk_size)):
+                yield chunk
@@ -1,18 +1,20 @@
 import pygame
 from app.utils.logic_game import load_image, get_valid_directions, load_sprite_sheet
-from app._class.Token import TokenBase, Token
+from app.utils.position import zobrist_key, position_key, ZOBRIST_BLACK_TO_MOVE
+from app._class.Token import Token
 
 
 class LogicGrid:
     def __init__(self, rows, columns):
         self.num_rows = rows
         self.num_columns = columns
-        self.tokens = {}
+        self.hash = 0
         self.logic_grid = self.generate_grid(rows, columns)
 
     def generate_grid(self, rows, columns):
         """Generates an empty grid for logical operations."""
         grid = [[0 for _ in range(columns)] for _ in range(rows)]
+        self.hash = 0
         self.insert_token(grid, 1, 3, 3)
         self.insert_token(grid, -1, 3, 4)
         self.insert_token(grid, 1, 4, 4)
@@ -39,8 +41,23 @@ class LogicGrid:
 
     def insert_token(self, grid, current_player, y, x):
         """Inserts a token into the grid at specified coordinates."""
-        self.tokens[(y, x)] = TokenBase(current_player, y, x)
-        grid[y][x] = self.tokens[(y, x)].player
+        if grid[y][x]:
+            self.hash ^= zobrist_key(y, x, grid[y][x])
+        self.hash ^= zobrist_key(y, x, current_player)
+        grid[y][x] = current_player
+
+    def flip_token(self, grid, y, x):
+        """Swaps the color of the token at the specified coordinates."""
+        self.hash ^= zobrist_key(y, x, grid[y][x]) ^ zobrist_key(y, x, -grid[y][x])
+        grid[y][x] *= -1
+
+    def get_hash(self, turn):
+        """Zobrist hash of the grid, kept up to date by insert_token and flip_token."""
+        return self.hash ^ ZOBRIST_BLACK_TO_MOVE if turn == -1 else self.hash
+
+    def get_position_key(self, turn):
+        """Stable key of the position, identical for all 8 symmetric boards."""
+        return position_key(self.logic_grid, turn)[0]
 
     def find_available_moves(self, grid, turn):
         """Identifies playable cells based on valid adjacent cells."""
@@ -127,7 +144,6 @@ class LogicGrid:
         return (count_white, count_black, count_empty)
 
     def reset_logic_grid(self):
-        self.tokens.clear()
         self.logic_grid = self.generate_grid(self.num_rows, self.num_columns)
 class DrawableGrid():
     def __init__(self, rows, columns, size, main):
@@ -142,6 +158,7 @@ class DrawableGrid():
         self.background_images = self.load_background_images()
 
         self.tokens = {}
+        self.token_pool = []
         self.background_image = self.create_background_image()
 
         self.logic_grid = self.generate_grid(rows, columns)
@@ -165,8 +182,41 @@ class DrawableGrid():
     def insert_token(self, grid, current_player, y, x):
         """Inserts a token into the grid at specified coordinates."""
         token_image = self.white_token_image if current_player == 1 else self.black_token_image
-        self.tokens[(y, x)] = Token(current_player, y, x, token_image, self.game)
-        grid[y][x] = self.tokens[(y, x)].player
+        if token := self.tokens.get((y, x)):
+            token.reset(current_player, y, x, token_image)
+        elif self.token_pool:
+            token = self.token_pool.pop()
+            token.reset(current_player, y, x, token_image)
+            self.tokens[(y, x)] = token
+        else:
+            self.tokens[(y, x)] = Token(current_player, y, x, token_image, self.game)
+        grid[y][x] = current_player
+
+    def clear_tokens(self):
+        """Returns every token sprite to the pool and empties the board."""
+        self.token_pool.extend(self.tokens.values())
+        self.tokens.clear()
+        self.logic_grid = self.generate_grid(self.num_rows, self.num_columns)
+
+    def remove_token(self, y, x):
+        """Removes the token at the specified coordinates, returning it to the pool."""
+        if token := self.tokens.pop((y, x), None):
+            self.token_pool.append(token)
+        self.logic_grid[y][x] = 0
+
+    def apply_grid(self, logic_grid):
+        """Brings the board to `logic_grid` touching only the cells that differ."""
+        changed_cells = []
+        for y, row in enumerate(logic_grid):
+            for x, player in enumerate(row):
+                if self.logic_grid[y][x] == player:
+                    continue
+                changed_cells.append((y, x))
+                if player == 0:
+                    self.remove_token(y, x)
+                else:
+                    self.insert_token(self.logic_grid, player, y, x)
+        return changed_cells
 
     def find_available_moves(self, grid, turn):
         """Identifies playable cells based on valid adjacent cells."""
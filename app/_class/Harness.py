@@ -0,0 +1,183 @@
+import json
+import random
+from collections import deque
+
+from app.enums.message import MessageType, PlayerStatusType
+from app.enums.room import DEFAULT_ROOM
+from app.utils.position import squares
+from app._class.HintService import HintService
+from app._class.RPCServer import RPCServer
+from app._class.TimerWheel import TimerWheel
+
+
+class FakeClock:
+    """Clock that only moves when told to."""
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+        return self.now
+
+
+class InlineDeliveryPool:
+    """DeliveryPool stand-in that delivers on the caller's thread as soon as a message is queued."""
+    def schedule(self, subscriber):
+        subscriber.drain()
+
+
+class FakeClient:
+    """
+    In-process client: the server's callbacks land in `inbox` and its calls go
+    straight to the RPCServer, with messages JSON-encoded as on the wire.
+    Received messages are only decoded when they are inspected.
+    """
+    def __init__(self, server, address, room_id=DEFAULT_ROOM):
+        self.server = server
+        self.address = address
+        self.room_id = room_id
+        self.inbox = deque()
+        self.player = None
+        self.token = None
+        self.seq = 0
+
+    def receive_message(self, message):
+        self.inbox.append(message)
+        return True
+
+    def decode_inbox(self):
+        return [json.loads(message) for message in self.inbox]
+
+    def register(self):
+        setup = self.server.register(self.address, self.room_id)
+        if not setup:
+            return None
+        setup = json.loads(setup)
+        if setup.get('type') == MessageType.ERROR.value:
+            return setup
+        self.player = setup['current_player']
+        self.token = setup['token']
+        return setup
+
+    def watch(self):
+        snapshot = json.loads(self.server.watch(self.address, self.room_id))
+        self.player = 0
+        return snapshot
+
+    def send(self, message):
+        """Sends a message as the real client does, returning the server's ERROR reply if any."""
+        response = self.server.send_message(self.player, json.dumps(message), self.room_id, self.token)
+        return json.loads(response) if response else None
+
+    def move(self, x, y):
+        self.seq += 1
+        return self.send({"type": MessageType.MOVE.value, "x": x, "y": y, "seq": self.seq})
+
+    def chat(self, *lines):
+        return self.send({"type": MessageType.CHAT.value, "lines": list(lines)})
+
+    def hint(self):
+        return self.send({"type": MessageType.HINT.value})
+
+    def restart(self):
+        return self.send({"type": MessageType.RESTART.value})
+
+    def give_up(self):
+        return self.send({"type": MessageType.GIVE_UP.value, "rival_status": PlayerStatusType.GAVE_UP.value})
+
+    def disconnect(self):
+        return self.send({"type": MessageType.GIVE_UP.value, "rival_status": PlayerStatusType.DISCONNECTED.value})
+
+    def received(self, message_type=None):
+        """Pops every message received so far, optionally only those of one type."""
+        messages = self.decode_inbox()
+        self.inbox.clear()
+        if message_type is None:
+            return messages
+        return [message for message in messages if message.get('type') == message_type]
+
+    def last(self, message_type):
+        """The most recent message of that type still in the inbox, or None."""
+        for message in reversed(self.decode_inbox()):
+            if message.get('type') == message_type:
+                return message
+        return None
+
+
+class Harness:
+    """
+    Runs an RPCServer in-process with no sockets, threads or wall clock.
+
+    Callbacks are delivered inline to FakeClients, hints are evaluated on
+    the caller's thread and the rate limiter and timer wheel read a
+    FakeClock, so a scripted game is fully deterministic. Call `advance` to
+    let time pass; due timers (clock flags) fire from it.
+
+        harness = Harness(time_control=(60, 1))
+        white, black = harness.pair()
+        harness.play(white, black, [(2, 3), (2, 2)])
+    """
+    MOVE_TIME = 0.5  # segundos entre jogadas de `play`, abaixo dos limites de taxa
+
+    def __init__(self, time_control=None, archive_path=None, seed=0):
+        self.clock = FakeClock()
+        self.timers = TimerWheel(clock=self.clock)
+        self.clients = {}
+        self.random = random.Random(seed)
+        self.server = RPCServer(proxy=self.get_proxy, archive_path=archive_path, time_control=time_control,
+                                hints=HintService(synchronous=True), timers=self.timers,
+                                pool=InlineDeliveryPool(), clock=self.clock)
+
+    def get_proxy(self, address):
+        return self.clients[address]
+
+    def client(self, room_id=DEFAULT_ROOM):
+        address = f"fake://{len(self.clients)}"
+        client = self.clients[address] = FakeClient(self.server, address, room_id)
+        return client
+
+    def join(self, room_id=DEFAULT_ROOM):
+        """Registers a new client, as a player if there is a free seat or as a spectator otherwise."""
+        client = self.client(room_id)
+        if client.register() is None:
+            client.watch()
+        return client
+
+    def pair(self, room_id=DEFAULT_ROOM):
+        """Seats two clients in the room, returning (white, black)."""
+        first, second = self.join(room_id), self.join(room_id)
+        return (first, second) if first.player == 1 else (second, first)
+
+    def advance(self, seconds):
+        """Lets time pass, firing due timers (clock flags, chat deliveries)."""
+        self.clock.advance(seconds)
+        self.timers.tick()
+
+    def room(self, room_id=DEFAULT_ROOM):
+        return self.server.get_room(room_id)
+
+    def play(self, white, black, moves, move_time=MOVE_TIME):
+        """
+        Plays (x, y) moves alternating by the room's turn, advancing the clock
+        `move_time` before each one. Returns the first ERROR reply, or None.
+        """
+        room = self.room(white.room_id)
+        for x, y in moves:
+            self.advance(move_time)
+            if error := (white if room.turn == 1 else black).move(x, y):
+                return error
+        return None
+
+    def play_random(self, white, black, move_time=MOVE_TIME):
+        """Plays random legal moves until the game ends, returning the moves played."""
+        room = self.room(white.room_id)
+        moves = []
+        while not room.game_over:
+            y, x = divmod(self.random.choice(list(squares(room.available_moves()))), 8)
+            if error := self.play(white, black, [(x, y)], move_time):
+                raise AssertionError(f"Legal move {(x, y)} refused: {error}")
+            moves.append((x, y))
+        return moves
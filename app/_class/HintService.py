@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from app._class.Evaluator import Evaluator
+from app.utils.position import position_key, pack, canonical, unpack, inverse_square
+
+
+class HintService:
+    """
+    Answers hint requests from every room of the process.
+
+    Requests are coalesced into micro-batches (up to BATCH_SIZE requests or
+    BATCH_WINDOW seconds) and requests for the same position, up to symmetry,
+    within a batch are evaluated once. Positions are evaluated in their
+    canonical orientation and results are kept in an LRU cache keyed by the
+    canonical position, so repeated and symmetric positions are answered
+    without being queued at all. A synchronous
+    service answers each request inline, for deterministic runs.
+    """
+    BATCH_SIZE = 64
+    BATCH_WINDOW = 0.005
+    CACHE_SIZE = 4096
+
+    def __init__(self, evaluator=None, cache_size=CACHE_SIZE, synchronous=False):
+        self.evaluator = evaluator or Evaluator()
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.requests = queue.SimpleQueue()
+        self.metrics = {"hint_cache_hits": 0, "hint_cache_misses": 0, "hint_batches": 0}
+        self.synchronous = synchronous
+        if not synchronous:
+            threading.Thread(target=self.run, daemon=True).start()
+
+    def to_original(self, evaluations, symmetry):
+        """Maps evaluations of the canonical board back onto the requester's board."""
+        if symmetry == 0:
+            return evaluations
+        original = []
+        for evaluation in evaluations:
+            y, x = inverse_square(symmetry, evaluation["y"], evaluation["x"])
+            original.append({"x": x, "y": y, "score": evaluation["score"]})
+        return original
+
+    def get_cached(self, key):
+        with self.lock:
+            if (evaluations := self.cache.get(key)) is not None:
+                self.cache.move_to_end(key)
+                self.metrics["hint_cache_hits"] += 1
+            return evaluations
+
+    def store(self, key, evaluations):
+        with self.lock:
+            self.cache[key] = evaluations
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def request(self, grid, turn, callback):
+        """Calls `callback(evaluations)` with the scored moves of `turn` in `grid`."""
+        key, symmetry = position_key(grid, turn)
+        if (evaluations := self.get_cached(key)) is not None:
+            callback(self.to_original(evaluations, symmetry))
+            return
+        request = (key, symmetry, [row[:] for row in grid], turn, callback)
+        if self.synchronous:
+            self.process_batch([request])
+        else:
+            self.requests.put(request)
+
+    def run(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.monotonic() + self.BATCH_WINDOW
+            while len(batch) < self.BATCH_SIZE and (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.process_batch(batch)
+
+    def process_batch(self, batch):
+        # Agrupa pedidos da mesma posição para avaliá-la uma vez só
+        pending = OrderedDict()
+        for key, symmetry, grid, turn, callback in batch:
+            if key not in pending:
+                white, black, _ = canonical(*pack(grid))
+                pending[key] = (unpack(white, black), turn, [])
+            pending[key][2].append((symmetry, callback))
+
+        answered = {}
+        missing = []
+        for key in pending:
+            if (evaluations := self.get_cached(key)) is not None:
+                answered[key] = evaluations
+            else:
+                missing.append(key)
+
+        if missing:
+            results = self.evaluator.evaluate_batch([pending[key][:2] for key in missing])
+            for key, evaluations in zip(missing, results):
+                self.store(key, evaluations)
+                answered[key] = evaluations
+            with self.lock:
+                self.metrics["hint_cache_misses"] += len(missing)
+                self.metrics["hint_batches"] += 1
+
+        for key, (grid, turn, callbacks) in pending.items():
+            for symmetry, callback in callbacks:
+                try:
+                    callback(self.to_original(answered[key], symmetry))
+                except Exception as error:
+                    print(f"Error answering hint request: {error!r}")
+
+    def get_metrics(self):
+        with self.lock:
+            return {**self.metrics, "hint_cache_size": len(self.cache)}
@@ -0,0 +1,109 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class Profiler:
+    """
+    On-demand profiling of a server process.
+
+    Nothing is measured until `start` opens a window of at most MAX_WINDOW
+    seconds; until then callers only pay for reading `active`. During the
+    window each `handle_message` branch is timed and either a sampler thread
+    walks every thread's stack (mode 'sample') or message handling runs
+    under cProfile (mode 'cprofile'). When the window closes the results are
+    written to `output_dir`: the per-handler timings as `<name>.timings.tsv`,
+    the samples as collapsed stacks in `<name>.folded` (one
+    `frame;frame;frame count` line per stack, ready for flamegraph.pl or
+    speedscope) and the cProfile statistics as `<name>.prof`.
+    """
+    MODES = ('sample', 'cprofile')
+    MAX_WINDOW = 60
+    SAMPLE_INTERVAL = 0.005
+
+    def __init__(self, output_dir='profiles', interval=SAMPLE_INTERVAL):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.active = False
+        self.mode = None
+        self.name = None
+        self.timings = {}
+        self.stacks = Counter()
+        self.profile = None
+
+    def start(self, seconds=10, mode='sample'):
+        """Opens a profiling window, returning the path prefix its files will be written to."""
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}")
+        seconds = min(max(float(seconds), 0.1), self.MAX_WINDOW)
+        with self.lock:
+            if self.active:
+                return None
+            self.mode = mode
+            self.name = os.path.join(self.output_dir, f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}")
+            self.timings = {}
+            self.stacks = Counter()
+            self.profile = cProfile.Profile() if mode == 'cprofile' else None
+            self.active = True
+        threading.Thread(target=self.run, args=(seconds,), daemon=True).start()
+        return self.name
+
+    def run(self, seconds):
+        deadline = time.perf_counter() + seconds
+        me = threading.get_ident()
+        while (remaining := deadline - time.perf_counter()) > 0:
+            if self.mode == 'sample':
+                self.sample(me)
+            time.sleep(min(self.interval, remaining))
+        with self.lock:
+            self.active = False
+            name, mode, timings, stacks, profile = self.name, self.mode, dict(self.timings), self.stacks, self.profile
+            self.profile = None
+            if profile is not None:
+                # ainda sob a trava: nenhuma chamada pode estar dentro do profile
+                os.makedirs(self.output_dir, exist_ok=True)
+                profile.dump_stats(f"{name}.prof")
+        self.write(name, mode, timings, stacks)
+
+    def sample(self, ignored_thread):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == ignored_thread:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def call(self, name, handler, *args):
+        """Runs `handler(*args)` timing it under `name` (and under cProfile in that mode)."""
+        start = time.perf_counter()
+        try:
+            if (profile := self.profile) is not None:
+                # cProfile não suporta ser usado por duas threads ao mesmo tempo
+                with self.lock:
+                    if profile is self.profile:
+                        return profile.runcall(handler, *args)
+            return handler(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                calls, total, worst = self.timings.get(name, (0, 0.0, 0.0))
+                self.timings[name] = (calls + 1, total + elapsed, max(worst, elapsed))
+
+    def write(self, name, mode, timings, stacks):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(f"{name}.timings.tsv", 'w') as output:
+            output.write("handler\tcalls\ttotal_ms\tmean_ms\tmax_ms\n")
+            for handler, (calls, total, worst) in sorted(timings.items(), key=lambda item: -item[1][1]):
+                output.write(f"{handler}\t{calls}\t{total * 1000:.3f}\t{total * 1000 / calls:.3f}\t{worst * 1000:.3f}\n")
+        if mode == 'sample':
+            with open(f"{name}.folded", 'w') as output:
+                for stack, count in stacks.most_common():
+                    output.write(f"{stack} {count}\n")
+        print(f"Profile written to {name}.*")
@@ -0,0 +1,232 @@
+import os
+import signal
+import threading
+import time
+import json
+from collections import Counter
+from xmlrpc.server import SimpleXMLRPCServer
+
+from app.utils.socket import get_local_LAN_ip, get_callback_proxy
+from app.enums.room import DEFAULT_ROOM
+from app._class.Room import Room, get_error
+from app._class.HintService import HintService
+from app._class.GameArchive import GameArchive
+from app._class.TimerWheel import TimerWheel
+from app._class.Profiler import Profiler
+
+
+class RPCServer:
+    # tempo máximo para entregar as mensagens ainda enfileiradas antes do snapshot
+    DRAIN_TIMEOUT = 5
+    SNAPSHOT_VERSION = 1
+    MAX_ROOMS = 1000
+    # As RPCs administrativas ficam em outra porta, só em 127.0.0.1
+    ADMIN_PORT_OFFSET = 1000
+
+    def __init__(self, host='0.0.0.0', port=8000, proxy=get_callback_proxy, archive_path=None, time_control=None,
+                 profile_dir='profiles', hints=None, timers=None, pool=None, clock=time.monotonic,
+                 snapshot_path=None, admin_port=None):
+        self.lock = threading.Lock()
+        self.host = host
+        self.port = port
+        self.admin_port = admin_port
+        self.proxy = proxy
+
+        self.rooms = {}
+        self.draining = False
+        self.snapshot_path = snapshot_path
+        self.rpc_server = None
+        self.hints = hints or HintService()
+        self.pool = pool
+        self.clock = clock
+        self.archive = GameArchive(archive_path) if archive_path else None
+        # Um único timer wheel vigia os relógios e agrupa o chat de todas as salas
+        self.time_control = time_control
+        self.timers = timers or TimerWheel().start()
+        self.profiler = Profiler(profile_dir)
+
+    def create_room(self, room_id):
+        return Room(room_id, self.proxy, on_empty=self.remove_room, hints=self.hints, archive=self.archive,
+                    time_control=self.time_control, timers=self.timers, profiler=self.profiler, pool=self.pool,
+                    clock=self.clock)
+
+    def get_room(self, room_id, create=False):
+        with self.lock:
+            if (room := self.rooms.get(room_id)) is None and create and not self.draining \
+                    and len(self.rooms) < self.MAX_ROOMS:
+                room = self.rooms[room_id] = self.create_room(room_id)
+            return room
+
+    def remove_room(self, room):
+        with self.lock:
+            if self.rooms.get(room.room_id) is room:
+                del self.rooms[room.room_id]
+
+    def register(self, callback_address, room_id=DEFAULT_ROOM):
+        """
+        Registra o cliente como 1 ou -1 na sala indicada.
+        """
+        if (room := self.get_room(room_id, create=True)) is None:
+            return get_error("server_draining" if self.draining else "server_full")
+        return room.join(callback_address)
+
+    def watch(self, callback_address, room_id=DEFAULT_ROOM):
+        """
+        Inscreve um espectador na sala indicada.
+        """
+        if room := self.get_room(room_id):
+            return room.watch(callback_address)
+        return get_error("unknown_room")
+
+    def send_message(self, sender, message, room_id=DEFAULT_ROOM, token=None):
+        """
+        Recebe a mensagem de um cliente e a encaminha à sala dele.
+        """
+        if (room := self.get_room(room_id)) is None:
+            return get_error("unknown_room")
+        try:
+            data = json.loads(message)
+            return room.receive(sender, data, token)  # Processa a mensagem
+        except json.JSONDecodeError:
+            print("Error decoding the JSON message.")
+
+    def get_metrics(self):
+        """Counters of rate-limited and dropped messages plus outbound queue depths."""
+        metrics = Counter()
+        with self.lock:
+            rooms = list(self.rooms.values())
+        for room in rooms:
+            metrics.update(room.get_metrics())
+        metrics.update(self.hints.get_metrics())
+        metrics["rooms"] = len(rooms)
+        return dict(metrics)
+
+    def profile(self, seconds=10, mode='sample'):
+        """
+        Profiles the server for `seconds` (sampling stacks or under cProfile),
+        returning the path prefix of the files written when the window closes.
+        """
+        if mode not in Profiler.MODES:
+            return get_error("unknown_mode")
+        return self.profiler.start(seconds, mode) or get_error("already_profiling")
+
+    def list_rooms(self):
+        with self.lock:
+            return list(self.rooms)
+
+    def export_room(self, room_id):
+        """Removes the room from this server and returns its replayable state."""
+        with self.lock:
+            room = self.rooms.pop(room_id, None)
+        return room.export_state() if room else None
+
+    def import_room(self, state):
+        """Rebuilds an exported room here; refuses to replace a room that already exists."""
+        with self.lock:
+            if state['room_id'] in self.rooms:
+                return False
+        room = self.create_room(state['room_id'])
+        room.restore_state(state)
+        with self.lock:
+            self.rooms[room.room_id] = room
+        return True
+
+    def drain(self):
+        """Stops creating rooms; games already running carry on."""
+        self.draining = True
+        return True
+
+    def request_shutdown(self, signum=None, frame=None):
+        """
+        Drains and stops serving. `shutdown` waits for the request in progress,
+        and it must run in another thread since serve_forever is the caller here.
+        """
+        self.drain()
+        if self.rpc_server:
+            threading.Thread(target=self.rpc_server.shutdown, daemon=True).start()
+
+    def wait_deliveries(self, timeout=DRAIN_TIMEOUT):
+        """Sends out pending chat and waits (up to `timeout`) for every queued message to be delivered."""
+        with self.lock:
+            rooms = list(self.rooms.values())
+        for room in rooms:
+            for recipient in (1, -1):
+                room.flush_chat(recipient)
+        deadline = time.monotonic() + timeout
+        while any(room.pending_deliveries() for room in rooms) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def save_snapshot(self, path):
+        """Exports every room to `path`, written atomically so a crash never leaves half a snapshot."""
+        with self.lock:
+            rooms, self.rooms = list(self.rooms.values()), {}
+        snapshot = {"version": self.SNAPSHOT_VERSION, "rooms": [room.export_state() for room in rooms]}
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w') as output:
+            json.dump(snapshot, output)
+        os.replace(temporary, path)
+        return len(rooms)
+
+    def load_snapshot(self, path):
+        with open(path) as snapshot:
+            snapshot = json.load(snapshot)
+        if snapshot.get('version') != self.SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a snapshot of this server version")
+        for state in snapshot['rooms']:
+            self.import_room(state)
+        return len(snapshot['rooms'])
+
+    def get_admin_port(self):
+        return self.admin_port or self.port + self.ADMIN_PORT_OFFSET
+
+    def serve_admin(self):
+        """
+        Serves the room migration, profiling and drain calls on 127.0.0.1 only:
+        they hand out session tokens, rebuild rooms, write files or turn
+        players away for good, so they must not share the players' port.
+        """
+        admin = SimpleXMLRPCServer(('127.0.0.1', self.get_admin_port()), allow_none=True, logRequests=False)
+        admin.register_function(self.list_rooms, 'list_rooms')
+        admin.register_function(self.export_room, 'export_room')
+        admin.register_function(self.import_room, 'import_room')
+        admin.register_function(self.get_metrics, 'metrics')
+        admin.register_function(self.profile, 'profile')
+        admin.register_function(self.drain, 'drain')
+        threading.Thread(target=admin.serve_forever, daemon=True).start()
+        return admin
+
+    def serve(self, restore=False):
+        with SimpleXMLRPCServer((self.host, self.port), allow_none=True, logRequests=False) as server:
+            self.rpc_server = server
+            # Restaura só depois de abrir a porta, para que os clientes possam responder ao UPDATE
+            if restore and self.snapshot_path and os.path.exists(self.snapshot_path):
+                print(f"{self.load_snapshot(self.snapshot_path)} rooms restored from {self.snapshot_path}")
+            # server.register_instance(self)
+            server.register_function(self.register, 'register')
+            server.register_function(self.send_message, 'send_message')
+            server.register_function(self.watch, 'watch')
+            server.register_function(self.get_metrics, 'metrics')
+
+            if hasattr(signal, 'SIGUSR1'):
+                # kill -USR1 <pid> abre uma janela de amostragem com os valores padrão
+                signal.signal(signal.SIGUSR1, lambda signum, frame: self.profiler.start())
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, self.request_shutdown)
+
+            admin = self.serve_admin()
+            print(f"Othello-RPC-Server Running: {get_local_LAN_ip()}:{self.port} (admin on 127.0.0.1:{self.get_admin_port()})")
+
+            server.serve_forever()
+            admin.shutdown()
+            admin.server_close()
+
+        print("Shutting down: delivering pending messages.")
+        self.wait_deliveries()
+        if self.snapshot_path:
+            count = self.save_snapshot(self.snapshot_path)
+            print(f"{count} rooms saved to {self.snapshot_path}")
+
+    def run(self, restore=False):
+        port = input("Enter the server port:").strip()
+        self.port = int(port)
+        self.serve(restore)
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from app.enums.message import MessageType
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at', 'clock')
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated_at = clock()
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def consume(self, amount=1):
+        """Takes `amount` tokens from the bucket, returning False if there are not enough."""
+        self.refill()
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+    def retry_after(self, amount=1):
+        """Seconds until `amount` tokens are available again."""
+        self.refill()
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    # (tokens per second, burst) for each message type; ANY caps the client's total traffic
+    ANY = '*'
+    LIMITS = {
+        ANY: (10, 20),
+        MessageType.MOVE.value: (2, 4),
+        MessageType.CHAT.value: (1, 5),
+        MessageType.RESTART.value: (0.2, 2),
+        MessageType.GIVE_UP.value: (1, 2),
+        MessageType.HINT.value: (2, 4),
+    }
+
+    def __init__(self, limits=None, clock=time.monotonic):
+        self.limits = {**self.LIMITS, **(limits or {})}
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def get_bucket(self, client, message_type):
+        key = (client, message_type)
+        if (bucket := self.buckets.get(key)) is None:
+            rate, capacity = self.limits.get(message_type, self.limits[self.ANY])
+            bucket = self.buckets[key] = TokenBucket(rate, capacity, self.clock)
+        return bucket
+
+    def check(self, client, message_type):
+        """
+        Checks the client's bucket for this message type and its overall bucket.
+
+        Returns 0 if the message may be processed, otherwise the number of
+        seconds the client should wait before retrying.
+        """
+        with self.lock:
+            overall = self.get_bucket(client, self.ANY)
+            # tipos sem limite próprio só contam no limite geral
+            if message_type in self.limits:
+                bucket = self.get_bucket(client, message_type)
+                if not bucket.consume():
+                    return bucket.retry_after()
+            if not overall.consume():
+                return overall.retry_after()
+            return 0
+
+    def export_state(self):
+        """Current token levels keyed by 'client|type', to carry buckets to another server."""
+        with self.lock:
+            for bucket in self.buckets.values():
+                bucket.refill()
+            return {f"{client}|{message_type}": bucket.tokens
+                    for (client, message_type), bucket in self.buckets.items()}
+
+    def restore_state(self, state):
+        with self.lock:
+            for key, tokens in state.items():
+                client, message_type = key.split('|', 1)
+                bucket = self.get_bucket(int(client), message_type)
+                bucket.tokens = min(bucket.capacity, tokens)
+
+    def forget(self, client):
+        """Drops the buckets of a client that left, so a new one starts full."""
+        with self.lock:
+            for key in [key for key in self.buckets if key[0] == client]:
+                del self.buckets[key]
@@ -0,0 +1,564 @@
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import Counter, deque
+
+from app.enums.message import MessageType, PlayerStatusType
+from app.enums.room import DEFAULT_ROOM
+from app.utils.socket import get_callback_proxy
+from app.utils.position import pack, unpack, zobrist_hash, legal_moves, flips, squares
+
+from app._class.Grid import LogicGrid
+from app._class.Subscriber import Subscriber, SpectatorHub
+from app._class.RateLimiter import RateLimiter
+
+
+def get_error(reason, retry_after=0):
+    return json.dumps({
+        "type": MessageType.ERROR.value,
+        "reason": reason,
+        "retry_after": retry_after
+    })
+
+
+class Room:
+    OUTBOUND_QUEUE_SIZE = 64
+    # chat: linhas guardadas, janela de agrupamento e limites por mensagem e por entrega pendente
+    CHAT_HISTORY = 50
+    CHAT_BATCH_WINDOW = 0.05
+    CHAT_MAX_LINES = 5
+    CHAT_MAX_LENGTH = 200
+    CHAT_PENDING_LIMIT = 32
+    # tipos de mensagem que um jogador pode enviar
+    CLIENT_MESSAGE_TYPES = {
+        MessageType.MOVE.value,
+        MessageType.CHAT.value,
+        MessageType.RESTART.value,
+        MessageType.GIVE_UP.value,
+        MessageType.HINT.value,
+    }
+
+    def __init__(self, room_id=DEFAULT_ROOM, proxy=get_callback_proxy, on_empty=None, hints=None, archive=None,
+                 time_control=None, timers=None, profiler=None, pool=None, clock=time.monotonic):
+        self.lock = threading.RLock()
+        self.room_id = room_id
+        self.proxy = proxy
+        self.on_empty = on_empty
+        self.hints = hints
+        self.archive = archive
+        self.profiler = profiler
+        self.pool = pool
+
+        # (base, increment) em segundos; sem controle de tempo as partidas não têm relógio
+        self.time_control = time_control if timers else None
+        self.timers = timers
+        self.clocks = {}
+        self.turn_started_at = None
+        self.flag_timer = None
+
+        self.conn_white = None
+        self.conn_black = None
+        self.addresses = {}
+        self.tokens = {}
+        self.spectators = SpectatorHub(pool=pool)
+        self.limiter = RateLimiter(clock=clock)
+        self.metrics = Counter()
+
+        self.chat_history = deque(maxlen=self.CHAT_HISTORY)
+        self.chat_pending = {1: [], -1: []}
+        self.chat_flush = {}
+
+        self.grid = LogicGrid(8, 8)
+        self.turn = -1
+        self.game_over = False
+        self.move_log = []
+        self.last_seq = {}
+        self.reset_clocks()
+
+    def join(self, callback_address):
+        """
+        Registra o cliente como 1 ou -1.
+        """
+        with self.lock: # thread-safe
+            if self.conn_white is None:
+                self.conn_white = self.connect(callback_address, 1)
+                setup = self.get_setup(1)
+            elif self.conn_black is None:
+                self.conn_black = self.connect(callback_address, -1)
+                setup = self.get_setup(-1)
+            else:
+                return 0  # Não há espaço para mais clientes
+            self.start_clock()
+            return setup
+
+    def connect(self, callback_address, client):
+        """Opens the client's callback connection behind a bounded outbound queue."""
+        self.addresses[client] = callback_address
+        self.tokens[client] = secrets.token_hex(16)
+        return Subscriber(self.proxy(callback_address), self.OUTBOUND_QUEUE_SIZE, pool=self.pool,
+                          on_error=lambda conn: self.handle_connection_error(conn, client))
+
+    def watch(self, callback_address):
+        """
+        Inscreve um espectador, que passa a receber os eventos da partida.
+        """
+        with self.lock:
+            self.spectators.subscribe(self.proxy(callback_address), callback_address)
+            return json.dumps(self.get_snapshot())
+
+    def is_authorized(self, sender, token):
+        """Checks that `sender` is a seat of this room and `token` the one handed out on join."""
+        if sender not in (1, -1) or not isinstance(token, str):
+            return False
+        return hmac.compare_digest(token, self.tokens.get(sender, ''))
+
+    def receive(self, sender, data, token):
+        """
+        Processa a mensagem de um cliente respeitando os limites de taxa.
+        """
+        if not self.is_authorized(sender, token):
+            self.metrics["unauthorized"] += 1
+            return get_error("unauthorized")
+        message_type = data.get('type')
+        if message_type not in self.CLIENT_MESSAGE_TYPES:
+            self.metrics["unknown_type"] += 1
+            return get_error("unknown_type")
+        # quem sai não depende do rival: um jogador sozinho também precisa liberar a vaga
+        leaving = message_type == MessageType.GIVE_UP.value and data.get('rival_status') == PlayerStatusType.DISCONNECTED.value
+        if not leaving and (self.conn_black if sender == 1 else self.conn_white) is None:
+            return get_error("rival_not_connected")
+        if retry_after := self.limiter.check(sender, message_type):
+            self.metrics[f"rate_limited:{message_type}"] += 1
+            return get_error("rate_limited", retry_after)
+        with self.lock:
+            return self.handle_message(data, sender)
+
+    def send_message_to(self, message, client, payload=None):
+        """
+        Enfileira a mensagem para o cliente sem nunca bloquear; `payload` é a
+        mensagem já codificada, quando ela vai para os dois jogadores.
+
+        Se a fila estiver cheia, chat é descartado; para mensagens de estado o
+        cliente não está acompanhando a partida e é removido em outra thread.
+        """
+        if conn := self.conn_white if client == 1 else self.conn_black:
+            if conn.offer(payload or json.dumps(message)):
+                return True
+            self.metrics[f"dropped:{message.get('type')}"] += 1
+            if message.get('type') != MessageType.CHAT.value and not conn.closed:
+                print(f"Client {client} is not draining its messages. Removing client.")
+                conn.close()
+                threading.Thread(target=self.handle_connection_error, args=(conn, client), daemon=True).start()
+        return False
+
+    def handle_connection_error(self, conn, client):
+        with self.lock:
+            if conn is (self.conn_white if client == 1 else self.conn_black):
+                print(f"Connection error with client {client}. Removing client.")
+                self.handle_disconnection(client)
+
+    def get_metrics(self):
+        """Counters of rate-limited and dropped messages plus outbound queue depths."""
+        with self.lock:
+            metrics = Counter(self.metrics)
+            for client, conn in ((1, self.conn_white), (-1, self.conn_black)):
+                if conn:
+                    metrics[f"outbound_queue:{client}"] += conn.queue.qsize()
+                    metrics[f"callback_errors:{client}"] += conn.errors
+            metrics["callback_errors:spectators"] += self.spectators.errors()
+            return metrics
+
+    def reset_clocks(self):
+        self.stop_clock()
+        if self.time_control:
+            self.clocks = {1: float(self.time_control[0]), -1: float(self.time_control[0])}
+
+    def start_clock(self):
+        """Starts the clock of the player on turn once both seats are taken."""
+        if not self.time_control or self.game_over or self.turn_started_at is not None:
+            return
+        if self.conn_white is None or self.conn_black is None:
+            return
+        self.turn_started_at = self.timers.clock()
+        player = self.turn
+        self.flag_timer = self.timers.schedule(self.clocks[player], lambda: self.handle_timeout(player))
+
+    def stop_clock(self):
+        """Charges the running turn to its player and stops the clock, returning the time left."""
+        if self.flag_timer:
+            self.flag_timer.cancel()
+            self.flag_timer = None
+        if self.turn_started_at is None:
+            return None
+        self.clocks[self.turn] -= self.timers.clock() - self.turn_started_at
+        self.turn_started_at = None
+        return self.clocks[self.turn]
+
+    def get_clocks(self):
+        """Seconds left for each player, counting the turn in progress."""
+        if not self.time_control:
+            return None
+        clocks = dict(self.clocks)
+        if self.turn_started_at is not None:
+            clocks[self.turn] -= self.timers.clock() - self.turn_started_at
+        return {"white": round(max(0.0, clocks[1]), 3), "black": round(max(0.0, clocks[-1]), 3)}
+
+    def handle_timeout(self, player):
+        """Called by the timer wheel when the player's flag falls."""
+        with self.lock:
+            if self.game_over or self.turn != player or self.turn_started_at is None:
+                return
+            self.stop_clock()
+            self.adjudicate_timeout(player)
+
+    def adjudicate_timeout(self, player):
+        self.clocks[player] = 0.0
+        self.game_over = True
+        self.metrics["timeouts"] += 1
+        self.send_game_over(timed_out=player)
+
+    def get_setup(self, client):
+        rival_status = PlayerStatusType.CONNECTED.value if (
+            self.conn_white if client == -1 else self.conn_black
+        ) else PlayerStatusType.DISCONNECTED.value
+
+        message = {
+            "type": MessageType.SETUP.value,
+            "current_player": client,
+            "grid": self.grid.logic_grid,
+            "turn": -1,
+            "rival_status": rival_status,
+            "token": self.tokens.get(client),
+            "clocks": self.get_clocks()
+        }
+
+        if client == 1 and self.conn_black != None:
+            self.send_rival_connected(-1)
+        elif client == -1 and self.conn_white != None:
+            self.send_rival_connected(1)
+
+        return json.dumps(message)
+
+    def get_snapshot(self):
+        """Full game state sent to spectators joining or lagging behind."""
+        return {
+            "type": MessageType.SETUP.value,
+            "current_player": 0,
+            "grid": self.grid.logic_grid,
+            "turn": self.turn,
+            "rival_status": PlayerStatusType.CONNECTED.value,
+            "clocks": self.get_clocks()
+        }
+
+    def publish(self, message):
+        self.spectators.publish(message, self.get_snapshot)
+
+    def send_setup(self, client):
+        setup = self.get_setup(client)
+        self.send_message_to(json.loads(setup), client)
+
+    def send_update(self, player=None, seq=None):
+        """
+        Envia o tabuleiro aos dois jogadores; `player` e `seq` identificam a
+        jogada para que o autor confirme a previsão local dele.
+        """
+        message = {
+            "type": MessageType.UPDATE.value,
+            "grid": self.grid.logic_grid,
+            "turn": self.turn,
+            "player": player,
+            "seq": seq,
+            "clocks": self.get_clocks()
+        }
+        payload = json.dumps(message)
+        self.send_message_to(message, 1, payload)
+        self.send_message_to(message, -1, payload)
+        self.publish(message)
+
+    def send_rival_connected(self, client):
+        message = {
+            "type": MessageType.RIVAL_CONNECTED.value,
+            "grid": self.grid.logic_grid,
+            "clocks": self.get_clocks()
+        }
+        self.send_message_to(message, client)
+
+    def send_game_over(self, timed_out=None):
+        message = {
+            "type": MessageType.GAME_OVER.value,
+        }
+        if timed_out:
+            # derrota por tempo: informa quem estourou o relógio
+            message.update({"reason": "timeout", "player": timed_out, "clocks": self.get_clocks()})
+        payload = json.dumps(message)
+        self.send_message_to(message, 1, payload)
+        self.send_message_to(message, -1, payload)
+        self.publish(message)
+
+    def get_bitboards(self):
+        """(own, opponent) bitboards of the board, from the point of view of the player on turn."""
+        white, black = pack(self.grid.logic_grid)
+        return (white, black) if self.turn == 1 else (black, white)
+
+    def available_moves(self):
+        """Bitboard of the legal moves of the player on turn, bit `y * 8 + x` for (x, y)."""
+        return legal_moves(*self.get_bitboards())
+
+    def is_legal(self, x, y, available_moves=None):
+        if not (isinstance(x, int) and isinstance(y, int) and 0 <= x < 8 and 0 <= y < 8):
+            return False
+        if available_moves is None:
+            available_moves = self.available_moves()
+        return bool(available_moves >> (y * 8 + x) & 1)
+
+    def apply_move(self, x, y, available_moves=None):
+        """Plays (x, y) for the player on turn, returning False if the move is not legal."""
+        if not self.is_legal(x, y, available_moves):
+            return False
+        own, opponent = self.get_bitboards()
+        flipped = flips(own, opponent, y * 8 + x)
+        self.grid.insert_token(self.grid.logic_grid, self.turn, y, x)
+        for square in squares(flipped):
+            self.grid.flip_token(self.grid.logic_grid, square // 8, square % 8)
+        self.turn *= -1
+        self.move_log.append((x, y))
+
+        if not legal_moves(opponent & ~flipped, own | flipped | 1 << (y * 8 + x)):
+            self.game_over = True
+        return True
+
+    def process_move(self, client, message):
+        if client != self.turn or self.game_over:
+            return get_error("not_your_turn")
+        x, y = message.get('x'), message.get('y')
+        available_moves = self.available_moves()
+        if not self.is_legal(x, y, available_moves):
+            return get_error("illegal_move")
+        if self.time_control and self.turn_started_at is not None:
+            # a jogada chegou depois de o tempo acabar, antes de o timer disparar
+            if self.stop_clock() <= 0:
+                self.adjudicate_timeout(client)
+                return get_error("timeout")
+            self.clocks[client] += self.time_control[1]
+        self.apply_move(x, y, available_moves)
+        self.last_seq[client] = message.get('seq')
+        self.start_clock()
+        self.send_update(client, message.get('seq'))
+        if self.game_over:
+            self.send_game_over()
+            if self.archive:
+                self.archive.append(self.move_log)
+
+    def process_chat(self, client, message):
+        """
+        Queues the lines for the rival; lines arriving within CHAT_BATCH_WINDOW
+        are delivered together as one CHAT message with a "lines" list.
+        """
+        lines = message.get('lines') or [message.get('content')]
+        if not isinstance(lines, list):
+            return get_error("invalid_chat")
+        lines = [str(line)[:self.CHAT_MAX_LENGTH] for line in lines[:self.CHAT_MAX_LINES] if line]
+        if not lines:
+            return get_error("invalid_chat")
+
+        recipient = client * -1
+        pending = self.chat_pending[recipient]
+        if len(pending) + len(lines) > self.CHAT_PENDING_LIMIT:
+            self.metrics["dropped:chat"] += len(lines)
+            return get_error("backpressure")
+        pending.extend(lines)
+        self.chat_history.extend((client, line) for line in lines)
+
+        if self.timers is None:
+            self.flush_chat(recipient)
+        elif recipient not in self.chat_flush:
+            self.chat_flush[recipient] = self.timers.schedule(self.CHAT_BATCH_WINDOW, lambda: self.flush_chat(recipient))
+
+    def pending_deliveries(self):
+        """Messages still queued for the players."""
+        with self.lock:
+            return sum(conn.queue.qsize() for conn in (self.conn_white, self.conn_black) if conn)
+
+    def flush_chat(self, recipient):
+        with self.lock:
+            self.chat_flush.pop(recipient, None)
+            lines, self.chat_pending[recipient] = self.chat_pending[recipient], []
+            if lines:
+                self.send_message_to({"type": MessageType.CHAT.value, "lines": lines}, recipient)
+
+    def process_hint(self, client):
+        if self.hints is None or self.turn != client or self.game_over:
+            return get_error("hint_unavailable")
+        move_count = len(self.move_log)
+
+        def send_hint(evaluations):
+            with self.lock:
+                # descarta a resposta se o tabuleiro mudou enquanto era avaliado
+                if len(self.move_log) == move_count and self.turn == client:
+                    self.send_message_to({"type": MessageType.HINT.value, "moves": evaluations}, client)
+
+        self.hints.request(self.grid.logic_grid, client, send_hint)
+
+    def reset_game(self):
+        self.grid.reset_logic_grid()
+        self.turn = -1
+        self.game_over = False
+        self.move_log.clear()
+        self.reset_clocks()
+
+    def process_restart(self):
+        self.reset_game()
+        self.start_clock()
+        self.send_setup(1)
+        self.send_setup(-1)
+        self.publish(self.get_snapshot())
+
+    def process_give_up(self, client, message):
+        rival_status = message.get('rival_status')
+        message = {
+            "type": MessageType.GIVE_UP.value,
+            "rival_status": rival_status
+        }
+        if rival_status == PlayerStatusType.DISCONNECTED.value:
+            return self.handle_disconnection(client)
+        self.stop_clock()
+        self.game_over = True
+        self.send_message_to(message, client*-1)
+        self.publish({**message, "player": client})
+
+    def handle_disconnection(self, client):
+        self.reset_game()
+        if conn := self.conn_white if client == 1 else self.conn_black:
+            conn.close()
+        if client == 1:
+            self.conn_white = None
+        else: self.conn_black = None
+        self.addresses.pop(client, None)
+        self.tokens.pop(client, None)
+        self.last_seq.pop(client, None)
+        self.limiter.forget(client)
+
+        message = {"type": MessageType.GIVE_UP.value, "rival_status": PlayerStatusType.DISCONNECTED.value}
+        self.send_message_to(message, client*-1)
+        self.publish({**message, "player": client})
+
+        if self.on_empty and self.conn_white is None and self.conn_black is None:
+            self.on_empty(self)
+
+    def handle_message(self, message, client):
+        if self.profiler and self.profiler.active:
+            return self.profiler.call(message.get('type'), self.dispatch_message, message, client)
+        return self.dispatch_message(message, client)
+
+    def dispatch_message(self, message, client):
+        message_type = message.get('type')
+
+        if message_type == MessageType.MOVE.value:
+            return self.process_move(client, message)
+
+        elif message_type == MessageType.CHAT.value:
+            return self.process_chat(client, message)
+
+        elif message_type == MessageType.RESTART.value:
+            self.process_restart()
+
+        elif message_type == MessageType.GIVE_UP.value:
+            self.process_give_up(client, message)
+
+        elif message_type == MessageType.HINT.value:
+            return self.process_hint(client)
+
+        else:
+            print("Unknown message type", message)
+
+    def export_state(self):
+        """
+        Detaches the room and describes it as its packed board, turn and move log
+        plus the players' and spectators' callback addresses, so another server
+        can rebuild it with `restore_state`. Session tokens, last move sequence
+        numbers, clocks, chat, rate limits and metrics travel along.
+        """
+        with self.lock:
+            self.stop_clock()
+            for timer in self.chat_flush.values():
+                timer.cancel()
+            self.chat_flush.clear()
+            for conn in (self.conn_white, self.conn_black):
+                if conn:
+                    conn.close()
+            self.conn_white = self.conn_black = None
+            spectators = self.spectators.addresses()
+            self.spectators.close()
+            white, black = pack(self.grid.logic_grid)
+            return {
+                "room_id": self.room_id,
+                "board": [f"{white:016x}", f"{black:016x}"],
+                "turn": self.turn,
+                "moves": [list(move) for move in self.move_log],
+                "seqs": {str(client): seq for client, seq in self.last_seq.items()},
+                "addresses": {str(client): address for client, address in self.addresses.items()},
+                "tokens": {str(client): token for client, token in self.tokens.items()},
+                "spectators": spectators,
+                "limits": self.limiter.export_state(),
+                "metrics": dict(self.metrics),
+                "clocks": {str(client): left for client, left in self.clocks.items()},
+                "chat": [list(line) for line in self.chat_history],
+                "chat_pending": {str(client): lines for client, lines in self.chat_pending.items() if lines},
+                "game_over": self.game_over,
+            }
+
+    def restore_state(self, state):
+        """
+        Rebuilds the board (from the packed board, or by replaying the move log),
+        reconnects players and spectators and resyncs them with an UPDATE, so
+        they carry on from where they were instead of starting over.
+        """
+        with self.lock:
+            self.reset_game()
+            if board := state.get('board'):
+                self.grid.logic_grid = unpack(int(board[0], 16), int(board[1], 16))
+                self.grid.hash = zobrist_hash(self.grid.logic_grid)
+                self.turn = state.get('turn', -1)
+                self.move_log = [tuple(move) for move in state.get('moves', [])]
+                self.game_over = not self.available_moves()
+            else:
+                for x, y in state.get('moves', []):
+                    if not self.apply_move(x, y):
+                        raise ValueError(f"Illegal move {(x, y)} while restoring room {self.room_id}")
+            self.last_seq = {int(client): seq for client, seq in state.get('seqs', {}).items()}
+            for client, address in state.get('addresses', {}).items():
+                if int(client) == 1:
+                    self.conn_white = self.connect(address, 1)
+                else:
+                    self.conn_black = self.connect(address, -1)
+            self.tokens.update({int(client): token for client, token in state.get('tokens', {}).items()})
+            for address in state.get('spectators', []):
+                self.spectators.subscribe(self.proxy(address), address)
+            self.limiter.restore_state(state.get('limits', {}))
+            self.metrics.update(state.get('metrics', {}))
+            self.chat_history.extend((client, line) for client, line in state.get('chat', []))
+            for client, lines in state.get('chat_pending', {}).items():
+                self.chat_pending[int(client)].extend(lines)
+            if self.time_control and state.get('clocks'):
+                self.clocks = {int(client): left for client, left in state['clocks'].items()}
+            # uma partida encerrada por tempo ou desistência não tem lance que o mostre
+            self.game_over = self.game_over or state.get('game_over', False)
+            self.start_clock()
+
+            # identifica a última jogada para que o autor confirme a previsão dele, se ainda estiver pendente
+            last_player = self.turn * -1 if self.move_log else None
+            message = {
+                "type": MessageType.UPDATE.value,
+                "grid": self.grid.logic_grid,
+                "turn": self.turn,
+                "player": last_player,
+                "seq": self.last_seq.get(last_player),
+                "clocks": self.get_clocks()
+            }
+            self.send_message_to(message, 1)
+            self.send_message_to(message, -1)
+            self.publish(self.get_snapshot())
+            for recipient in (1, -1):
+                self.flush_chat(recipient)
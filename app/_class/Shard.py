@@ -0,0 +1,153 @@
+import bisect
+import hashlib
+import threading
+
+from xmlrpc.client import ServerProxy
+
+
+class HashRing:
+    def __init__(self, nodes=(), replicas=64):
+        self.replicas = replicas
+        self.keys = []
+        self.ring = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def hash(value):
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+    def add(self, node):
+        """Places `replicas` virtual points for the node on the ring."""
+        for i in range(self.replicas):
+            key = self.hash(f"{node}#{i}")
+            self.ring[key] = node
+            bisect.insort(self.keys, key)
+
+    def remove(self, node):
+        for i in range(self.replicas):
+            key = self.hash(f"{node}#{i}")
+            del self.ring[key]
+            self.keys.remove(key)
+
+    def get_node(self, room_id):
+        """Returns the node owning the room: the first point clockwise from its hash."""
+        if not self.keys:
+            raise LookupError("No shards available")
+        index = bisect.bisect(self.keys, self.hash(room_id)) % len(self.keys)
+        return self.ring[self.keys[index]]
+
+    @property
+    def nodes(self):
+        return sorted(set(self.ring.values()))
+
+
+class ShardRouter:
+    """
+    Front-end that forwards each call to the worker owning the room.
+
+    The router keeps no game state: the owner of a room only depends on the
+    set of shard addresses, so any number of routers agree on the routing.
+    It is meant to be served by a threading server; each thread keeps its own
+    proxies since ServerProxy is not thread-safe.
+
+    Each shard is given as (address, admin address); rooms are moved through
+    the admin address, which the shards only serve on 127.0.0.1. When shards
+    are added or removed, the rooms that change owner are migrated before the
+    new ring is published: calls for a room being moved wait for it, and a
+    moved room is routed to its new shard right away.
+    """
+    def __init__(self, shards):
+        self.lock = threading.Lock()
+        self.migrated = threading.Condition(self.lock)
+        self.rebalance_lock = threading.Lock()
+        self.local = threading.local()
+        self.admin_addresses = dict(shards)
+        self.ring = HashRing(self.admin_addresses)
+        self.migrating = set()
+        self.moved = {}
+
+    def get_proxy(self, address):
+        proxies = self.local.__dict__.setdefault('proxies', {})
+        if (proxy := proxies.get(address)) is None:
+            proxy = proxies[address] = ServerProxy(address, allow_none=True)
+        return proxy
+
+    def get_admin_proxy(self, address):
+        with self.lock:
+            admin_address = self.admin_addresses[address]
+        return self.get_proxy(admin_address)
+
+    def get_shard(self, room_id):
+        with self.lock:
+            while room_id in self.migrating:
+                self.migrated.wait()
+            address = self.moved.get(room_id) or self.ring.get_node(room_id)
+        return self.get_proxy(address)
+
+    def register(self, callback_address, room_id):
+        return self.get_shard(room_id).register(callback_address, room_id)
+
+    def watch(self, callback_address, room_id):
+        return self.get_shard(room_id).watch(callback_address, room_id)
+
+    def send_message(self, sender, message, room_id, token=None):
+        return self.get_shard(room_id).send_message(sender, message, room_id, token)
+
+    def get_metrics(self):
+        metrics = {}
+        with self.lock:
+            addresses = self.ring.nodes
+        for address in addresses:
+            for key, value in self.get_proxy(address).metrics().items():
+                metrics[key] = metrics.get(key, 0) + value
+        return metrics
+
+    def migrate_room(self, room_id, source, target):
+        """Moves a room between shards by replaying its state on the target."""
+        with self.lock:
+            self.migrating.add(room_id)
+        try:
+            if state := self.get_admin_proxy(source).export_room(room_id):
+                if self.get_admin_proxy(target).import_room(state):
+                    with self.lock:
+                        self.moved[room_id] = target
+        finally:
+            with self.lock:
+                self.migrating.discard(room_id)
+                self.migrated.notify_all()
+
+    def rebalance(self, old_ring, new_ring):
+        """Migrates every room whose owner differs between `old_ring` and `new_ring`."""
+        for address in old_ring.nodes:
+            for room_id in self.get_admin_proxy(address).list_rooms():
+                if (owner := new_ring.get_node(room_id)) != address:
+                    self.migrate_room(room_id, address, owner)
+
+    def publish(self, new_ring):
+        with self.lock:
+            self.ring = new_ring
+            self.moved.clear()
+
+    def add_shard(self, address, admin_address):
+        with self.rebalance_lock:
+            with self.lock:
+                self.admin_addresses[address] = admin_address
+                old_ring = self.ring
+            new_ring = HashRing(old_ring.nodes, old_ring.replicas)
+            new_ring.add(address)
+            self.rebalance(old_ring, new_ring)
+            self.publish(new_ring)
+        return True
+
+    def remove_shard(self, address):
+        with self.rebalance_lock:
+            with self.lock:
+                old_ring = self.ring
+            new_ring = HashRing(old_ring.nodes, old_ring.replicas)
+            new_ring.remove(address)
+            self.rebalance(old_ring, new_ring)
+            self.publish(new_ring)
+            with self.lock:
+                self.admin_addresses.pop(address, None)
+        return True
@@ -0,0 +1,203 @@
+import json
+import queue
+import threading
+import time
+from xmlrpc.client import Fault, ProtocolError
+
+
+class DeliveryPool:
+    """
+    Small fixed set of threads shared by every subscriber of one kind.
+
+    A subscriber with pending messages is scheduled once on the ready queue;
+    whichever worker picks it up delivers a batch and re-schedules it if more
+    arrived, so each subscriber is served by at most one thread at a time.
+    """
+    def __init__(self, workers=8):
+        self.ready = queue.SimpleQueue()
+        for _ in range(workers):
+            threading.Thread(target=self.run, daemon=True).start()
+
+    def schedule(self, subscriber):
+        self.ready.put(subscriber)
+
+    def run(self):
+        while True:
+            self.ready.get().drain()
+
+
+PLAYERS = 'players'
+SPECTATORS = 'spectators'
+_delivery_pools = {}
+_delivery_pool_lock = threading.Lock()
+
+
+def get_delivery_pool(name=PLAYERS):
+    """
+    Process-wide pool by name. Players and spectators have separate pools so
+    slow watchers can never hold up the workers delivering the game.
+    """
+    with _delivery_pool_lock:
+        if (pool := _delivery_pools.get(name)) is None:
+            pool = _delivery_pools[name] = DeliveryPool()
+        return pool
+
+
+class Subscriber:
+    BATCH_SIZE = 16
+
+    def __init__(self, conn, maxsize=32, on_error=None, pool=None, address=None):
+        self.conn = conn
+        self.address = address
+        self.on_error = on_error
+        self.pool = pool or get_delivery_pool()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize)
+        self.scheduled = False
+        self.snapshot_only = False
+        self.lagging_since = 0
+        self.closed = False
+        self.errors = 0
+        self.last_delivery_time = 0.0
+
+    def offer(self, payload):
+        """Queues an already encoded message without ever blocking the caller."""
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            return False
+        self.schedule()
+        return True
+
+    def replace_with(self, payload):
+        """Discards everything still pending and leaves only the given payload queued."""
+        self.clear()
+        return self.offer(payload)
+
+    def clear(self):
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def close(self):
+        self.closed = True
+        self.clear()
+
+    def schedule(self):
+        with self.lock:
+            if self.scheduled or self.closed:
+                return
+            self.scheduled = True
+        self.pool.schedule(self)
+
+    def drain(self):
+        """Delivers up to BATCH_SIZE messages; called from a DeliveryPool worker."""
+        for _ in range(self.BATCH_SIZE):
+            if self.closed:
+                break
+            try:
+                payload = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.deliver(payload)
+        with self.lock:
+            self.scheduled = False
+        if not self.closed and not self.queue.empty():
+            self.schedule()
+
+    def deliver(self, payload):
+        start = time.monotonic()
+        try:
+            self.conn.receive_message(payload)
+        except (OSError, ProtocolError):
+            self.errors += 1
+            self.close()
+            if self.on_error:
+                self.on_error(self)
+        except Fault:
+            # O cliente recebeu, mas o handler dele falhou: segue entregando
+            self.errors += 1
+        except Exception as error:
+            self.errors += 1
+            print(f"Error delivering message: {error!r}")
+        finally:
+            self.last_delivery_time = time.monotonic() - start
+
+
+class SpectatorHub:
+    MAX_LAG_SECONDS = 10
+    # espectador cujo callback demora mais que isso só recebe o estado atual
+    SLOW_DELIVERY_SECONDS = 0.2
+
+    def __init__(self, queue_size=32, pool=None):
+        self.lock = threading.Lock()
+        self.queue_size = queue_size
+        self.pool = pool or get_delivery_pool(SPECTATORS)
+        self.subscribers = []
+
+    def subscribe(self, conn, address=None):
+        subscriber = Subscriber(conn, self.queue_size, pool=self.pool, address=address)
+        with self.lock:
+            self.subscribers.append(subscriber)
+        return subscriber
+
+    def publish(self, message, snapshot):
+        """
+        Encodes the event once and fans it out to every watcher.
+
+        Watchers whose queue is full, or whose last callback took longer than
+        SLOW_DELIVERY_SECONDS, are switched to snapshot-only delivery: their
+        backlog is replaced by the current state (built by `snapshot`) so
+        each costs at most one pending call, until they catch up. They are
+        dropped if they lag for too long.
+        """
+        with self.lock:
+            if not self.subscribers:
+                return
+            payload = None
+            snapshot_payload = None
+            alive = []
+            for subscriber in self.subscribers:
+                if subscriber.closed:
+                    continue
+
+                if subscriber.snapshot_only and subscriber.queue.empty():
+                    subscriber.snapshot_only = False
+
+                if not subscriber.snapshot_only:
+                    if subscriber.last_delivery_time <= self.SLOW_DELIVERY_SECONDS:
+                        if payload is None:
+                            payload = json.dumps(message)
+                        if subscriber.offer(payload):
+                            alive.append(subscriber)
+                            continue
+                    subscriber.snapshot_only = True
+                    subscriber.lagging_since = time.monotonic()
+
+                if time.monotonic() - subscriber.lagging_since > self.MAX_LAG_SECONDS:
+                    subscriber.close()
+                    continue
+
+                if snapshot_payload is None:
+                    snapshot_payload = json.dumps(snapshot())
+                subscriber.replace_with(snapshot_payload)
+                alive.append(subscriber)
+            self.subscribers = alive
+
+    def addresses(self):
+        with self.lock:
+            return [subscriber.address for subscriber in self.subscribers
+                    if subscriber.address and not subscriber.closed]
+
+    def errors(self):
+        with self.lock:
+            return sum(subscriber.errors for subscriber in self.subscribers)
+
+    def close(self):
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.close()
+            self.subscribers = []
+
@@ -0,0 +1,89 @@
+import math
+import threading
+import time
+
+
+class Timer:
+    __slots__ = ('deadline', 'tick', 'callback', 'cancelled')
+
+    def __init__(self, deadline, tick, callback):
+        self.deadline = deadline
+        self.tick = tick
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel shared by every room of the process.
+
+    Timers are hashed into SLOTS buckets by the tick they expire on, so
+    scheduling and cancelling are O(1) and each tick only looks at one bucket,
+    whatever the number of rooms. `tick(now)` fires everything due up to `now`;
+    `start` runs it from a single thread, or it can be called directly with an
+    injected clock to drive the wheel deterministically.
+    """
+    RESOLUTION = 0.01
+    SLOTS = 512
+
+    def __init__(self, resolution=RESOLUTION, slots=SLOTS, clock=time.perf_counter):
+        self.resolution = resolution
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.slots = [[] for _ in range(slots)]
+        self.started_at = clock()
+        self.current_tick = 0
+        self.thread = None
+
+    def schedule(self, delay, callback):
+        """Calls `callback()` once `delay` seconds have passed; returns a cancellable Timer."""
+        deadline = self.clock() + max(0.0, delay)
+        with self.lock:
+            tick = max(self.current_tick + 1, math.ceil((deadline - self.started_at) / self.resolution))
+            timer = Timer(deadline, tick, callback)
+            self.slots[tick % len(self.slots)].append(timer)
+        return timer
+
+    def tick(self, now=None):
+        """Fires the timers due by `now` (the wheel's clock by default)."""
+        now = self.clock() if now is None else now
+        target = math.floor((now - self.started_at) / self.resolution)
+        due = []
+        with self.lock:
+            # Depois de uma pausa longa basta uma volta completa para ver todos os baldes
+            first = max(self.current_tick + 1, target - len(self.slots) + 1)
+            for tick in range(first, target + 1):
+                slot = self.slots[tick % len(self.slots)]
+                if not slot:
+                    continue
+                pending = []
+                for timer in slot:
+                    if timer.cancelled:
+                        continue
+                    (due if timer.tick <= target else pending).append(timer)
+                slot[:] = pending
+            self.current_tick = max(self.current_tick, target)
+
+        due.sort(key=lambda timer: timer.deadline)
+        for timer in due:
+            if timer.cancelled:
+                continue
+            try:
+                timer.callback()
+            except Exception as error:
+                print(f"Error running timer: {error!r}")
+        return len(due)
+
+    def run(self):
+        while True:
+            time.sleep(self.resolution)
+            self.tick()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
@@ -1,4 +1,6 @@
 class TokenBase:
+    __slots__ = ('player', 'grid_x', 'grid_y', 'pos_x', 'pos_y')
+
     def __init__(self, player, grid_x, grid_y):
         self.player = player
         self.grid_x = grid_x
@@ -7,11 +9,18 @@ class TokenBase:
         self.pos_y = 80 + (grid_x * 80)
 
 class Token(TokenBase):
+    __slots__ = ('image', 'game')
+
     def __init__(self, player, grid_x, grid_y, image, game):
         super().__init__(player, grid_x, grid_y)
         self.image = image
         self.game = game
 
+    def reset(self, player, grid_x, grid_y, image):
+        """Reuses a pooled token for another cell instead of allocating a new one."""
+        TokenBase.__init__(self, player, grid_x, grid_y)
+        self.image = image
+
     def animate_transition(self, transition_images, final_image):
         for i in range(30):
             self.image = transition_images[i // 10]
@@ -11,6 +11,7 @@ class MessageType(Enum):
     GIVE_UP = "give_up"
     RESTART = "restart"
     RIVAL_CONNECTED = "rival_connected"
+    HINT = "hint"
 
 class PlayerStatusType(Enum):
     GAVE_UP = "GAVE UP"
@@ -0,0 +1 @@
+DEFAULT_ROOM = 'default'
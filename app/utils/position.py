@@ -0,0 +1,254 @@
+import random
+
+# Bitboards: bit (y * 8 + x) is set when the disc at row y, column x belongs to that color
+FULL = 0xFFFFFFFFFFFFFFFF
+
+ZOBRIST_SEED = 0x0E11
+_zobrist_random = random.Random(ZOBRIST_SEED)
+# One key per (square, color): index 0 for white (1), 1 for black (-1)
+ZOBRIST = [(_zobrist_random.getrandbits(64), _zobrist_random.getrandbits(64)) for _ in range(64)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+
+
+def pack(grid):
+    """
+    Pack a logic grid into a pair of 64-bit boards.
+
+    Args:
+        grid (list of list): The 8x8 logic grid with 1 (white), -1 (black) and 0 (empty).
+
+    Returns:
+        tuple: (white, black) bitboards.
+    """
+    white = black = 0
+    bit = 1
+    for row in grid:
+        for cell in row:
+            if cell == 1:
+                white |= bit
+            elif cell == -1:
+                black |= bit
+            bit <<= 1
+    return white, black
+
+
+def unpack(white, black):
+    """
+    Rebuild a logic grid from a pair of bitboards.
+
+    Args:
+        white (int): The white bitboard.
+        black (int): The black bitboard.
+
+    Returns:
+        list of list: The 8x8 logic grid.
+    """
+    return [[1 if white >> (y * 8 + x) & 1 else -1 if black >> (y * 8 + x) & 1 else 0
+             for x in range(8)] for y in range(8)]
+
+
+def flip_vertical(board):
+    """Mirror the board top to bottom (row y becomes row 7 - y)."""
+    return int.from_bytes(board.to_bytes(8, 'big'), 'little')
+
+
+def mirror_horizontal(board):
+    """Mirror the board left to right (column x becomes column 7 - x)."""
+    board = ((board >> 1) & 0x5555555555555555) | ((board & 0x5555555555555555) << 1)
+    board = ((board >> 2) & 0x3333333333333333) | ((board & 0x3333333333333333) << 2)
+    board = ((board >> 4) & 0x0F0F0F0F0F0F0F0F) | ((board & 0x0F0F0F0F0F0F0F0F) << 4)
+    return board
+
+
+def flip_diagonal(board):
+    """Transpose the board along its main diagonal ((y, x) becomes (x, y))."""
+    t = 0x0F0F0F0F00000000 & (board ^ (board << 28))
+    board ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (board ^ (board << 14))
+    board ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (board ^ (board << 7))
+    board ^= t ^ (t >> 7)
+    return board & FULL
+
+
+def transform(symmetry, board):
+    """
+    Apply one of the 8 board symmetries.
+
+    Args:
+        symmetry (int): 0 to 7; bit 0 mirrors left to right, bit 1 mirrors top to
+            bottom and bit 2 transposes, applied in that order.
+        board (int): The bitboard to transform.
+
+    Returns:
+        int: The transformed bitboard.
+    """
+    if symmetry & 1:
+        board = mirror_horizontal(board)
+    if symmetry & 2:
+        board = flip_vertical(board)
+    if symmetry & 4:
+        board = flip_diagonal(board)
+    return board
+
+
+# SQUARE_MAP[symmetry][square] is where `square` lands under that symmetry
+SQUARE_MAP = [[transform(symmetry, 1 << square).bit_length() - 1 for square in range(64)] for symmetry in range(8)]
+INVERSE_SQUARE_MAP = [[0] * 64 for _ in range(8)]
+for _symmetry, _squares in enumerate(SQUARE_MAP):
+    for _square, _target in enumerate(_squares):
+        INVERSE_SQUARE_MAP[_symmetry][_target] = _square
+
+
+def transform_square(symmetry, y, x):
+    """Return the (y, x) where the square lands under `symmetry`."""
+    return divmod(SQUARE_MAP[symmetry][y * 8 + x], 8)
+
+
+def inverse_square(symmetry, y, x):
+    """Return the original (y, x) of a square of a board transformed by `symmetry`."""
+    return divmod(INVERSE_SQUARE_MAP[symmetry][y * 8 + x], 8)
+
+
+def canonical(white, black):
+    """
+    Find the canonical form of a position among its 8 symmetric variants.
+
+    Args:
+        white (int): The white bitboard.
+        black (int): The black bitboard.
+
+    Returns:
+        tuple: (white, black, symmetry) with the smallest (white, black) pair and
+            the symmetry that produces it from the given boards.
+    """
+    best = (white, black, 0)
+    for symmetry in range(1, 8):
+        candidate = (transform(symmetry, white), transform(symmetry, black), symmetry)
+        if candidate[:2] < best[:2]:
+            best = candidate
+    return best
+
+
+def position_key(grid, turn):
+    """
+    Build a stable key identifying a position up to symmetry.
+
+    Args:
+        grid (list of list): The 8x8 logic grid.
+        turn (int): The player to move, 1 or -1.
+
+    Returns:
+        tuple: (key, symmetry) where key is a string such as 'b:<white hex>:<black hex>'
+            and symmetry maps the grid onto the canonical board.
+    """
+    white, black, symmetry = canonical(*pack(grid))
+    return f"{'w' if turn == 1 else 'b'}:{white:016x}:{black:016x}", symmetry
+
+
+def zobrist_key(y, x, player):
+    """Return the Zobrist key of a `player` disc at (y, x)."""
+    return ZOBRIST[y * 8 + x][0 if player == 1 else 1]
+
+
+def zobrist_hash(grid, turn=None):
+    """
+    Compute the Zobrist hash of a grid from scratch.
+
+    Args:
+        grid (list of list): The 8x8 logic grid.
+        turn (int, optional): The player to move; black to move is hashed in when -1.
+
+    Returns:
+        int: The 64-bit hash.
+    """
+    value = 0
+    for y, row in enumerate(grid):
+        for x, cell in enumerate(row):
+            if cell:
+                value ^= zobrist_key(y, x, cell)
+    if turn == -1:
+        value ^= ZOBRIST_BLACK_TO_MOVE
+    return value
+
+
+# Square masks that keep a shifted board from wrapping around to the other edge
+NOT_FIRST_COLUMN = 0xFEFEFEFEFEFEFEFE
+NOT_LAST_COLUMN = 0x7F7F7F7F7F7F7F7F
+# (shift, mask) for the 8 directions; a positive shift moves discs to higher squares
+DIRECTIONS = (
+    (1, NOT_FIRST_COLUMN), (-1, NOT_LAST_COLUMN), (8, FULL), (-8, FULL),
+    (9, NOT_FIRST_COLUMN), (7, NOT_LAST_COLUMN), (-7, NOT_FIRST_COLUMN), (-9, NOT_LAST_COLUMN),
+)
+
+
+def shift(board, amount, mask):
+    """Move every disc of the board one step in a direction of DIRECTIONS."""
+    return (board << amount if amount > 0 else board >> -amount) & mask
+
+
+def popcount(board):
+    """Return the number of discs on the board."""
+    return bin(board).count('1')
+
+
+def squares(board):
+    """Yield the square (y * 8 + x) of every disc, in increasing order."""
+    while board:
+        lowest = board & -board
+        yield lowest.bit_length() - 1
+        board ^= lowest
+
+
+def legal_moves(own, opponent):
+    """
+    Find every legal move at once.
+
+    Args:
+        own (int): The bitboard of the player to move.
+        opponent (int): The bitboard of the other player.
+
+    Returns:
+        int: A bitboard with one bit set per legal move.
+    """
+    empty = ~(own | opponent) & FULL
+    moves = 0
+    # shift() inlined: this runs for every move the server validates
+    for amount, mask in DIRECTIONS:
+        inner = opponent & mask
+        if amount > 0:
+            line = own << amount & inner
+            for _ in range(5):
+                line |= line << amount & inner
+            moves |= line << amount & mask & empty
+        else:
+            amount = -amount
+            line = own >> amount & inner
+            for _ in range(5):
+                line |= line >> amount & inner
+            moves |= line >> amount & mask & empty
+    return moves
+
+
+def flips(own, opponent, square):
+    """
+    Find the discs flipped by playing on a square.
+
+    Args:
+        own (int): The bitboard of the player to move.
+        opponent (int): The bitboard of the other player.
+        square (int): The square played, y * 8 + x.
+
+    Returns:
+        int: The bitboard of the opponent discs that change color.
+    """
+    flipped = 0
+    for amount, mask in DIRECTIONS:
+        line = 0
+        cursor = shift(1 << square, amount, mask)
+        while cursor & opponent:
+            line |= cursor
+            cursor = shift(cursor, amount, mask)
+        if cursor & own:
+            flipped |= line
+    return flipped
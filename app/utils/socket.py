@@ -1,4 +1,5 @@
 import socket
+from xmlrpc.client import ServerProxy, Transport
 
 
 def get_local_LAN_ip():
@@ -12,4 +13,23 @@ def get_local_LAN_ip():
         local_ip = '127.0.0.1'  # Fallback to localhost if it fails
     finally:
         LAN_socket.close()
-    return local_ip
\ No newline at end of file
+    return local_ip
+
+
+class TimeoutTransport(Transport):
+    def __init__(self, timeout, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+def get_callback_proxy(callback_address, timeout=5):
+    """
+    Proxy for a client's callback server whose calls give up after `timeout`
+    seconds, so a hung client cannot hold a delivery thread forever.
+    """
+    return ServerProxy(callback_address, transport=TimeoutTransport(timeout), allow_none=True)
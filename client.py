@@ -1,15 +1,24 @@
 import socket
 import json
+import queue
+import time
 import pygame
 import threading
+from collections import OrderedDict, deque
+from itertools import islice
 
 from app.enums.message import MessageType, PlayerStatusType
 from app._class.Grid import DrawableGrid
+from app.enums.room import DEFAULT_ROOM
 
-from xmlrpc.client import ServerProxy
+from xmlrpc.client import ServerProxy, Error as XMLRPCError
 from xmlrpc.server import SimpleXMLRPCServer
 
 class Client:
+    CHAT_HISTORY = 100
+    CHAT_BATCH_LINES = 5
+    TEXT_CACHE_SIZE = 256
+
     def __init__(self, host='0.0.0.0', port=5555):
         self.host = host
         self.port = port
@@ -27,7 +36,9 @@ class Client:
 
         self.INPUT_TEXT = ''
         self.FONT = pygame.font.SysFont('arial', 18)
-        self.chat_history = []
+        self.chat_history = deque(maxlen=self.CHAT_HISTORY)
+        # Textos já renderizados, para não rasterizar as mesmas linhas a cada frame
+        self.text_cache = OrderedDict()
 
         self.white_score = 2
         self.white_score_text = 'white'
@@ -38,6 +49,24 @@ class Client:
 
         self.remote_server = None
         self.callback_address = None
+        self.room_id = DEFAULT_ROOM
+        self.token = None
+        self.info_text = ''
+        self.hints = []
+
+        # Jogadas aplicadas localmente e ainda não confirmadas pelo servidor
+        self.move_seq = 0
+        self.pending_moves = {}
+
+        # Relógios da partida ({"white", "black"} em segundos) e quando chegaram
+        self.clocks = None
+        self.clocks_received_at = 0
+
+        # Mensagens recebidas, tratadas pelo loop principal uma vez por frame
+        self.inbox = queue.SimpleQueue()
+        # Mensagens a enviar, despachadas por uma thread para não travar o frame
+        self.outbox = queue.SimpleQueue()
+        self.sender_thread = None
 
     def start_callback_server(self, port=0):
         """
@@ -46,7 +75,7 @@ class Client:
         def receive_message(message):
             msg = json.loads(message)
             print(f"\nMessage received: {msg}")
-            self.handle_message(msg)
+            self.inbox.put(msg)
             return True
 
         # Inicia o servidor e captura o endereço
@@ -63,17 +92,28 @@ class Client:
         self.callback_address = self.start_callback_server()
         print(f"Listening on: {self.callback_address}")
 
-        setup_data = self.remote_server.register(self.callback_address)
+        setup_data = self.remote_server.register(self.callback_address, self.room_id)
+        if setup_data == 0:
+            # Partida cheia: entra como espectador
+            setup_data = self.remote_server.watch(self.callback_address, self.room_id)
+        if json.loads(setup_data).get('type') == MessageType.ERROR.value:
+            # ex.: servidor em drenagem para deploy, ou sala inexistente para espectador
+            raise ConnectionError(f"Server refused the connection: {json.loads(setup_data).get('reason')}")
         self.process_setup(json.loads(setup_data))
 
         print(f"Connected as Client: {self.current_player}")
         print(json.loads(setup_data))
 
+        self.sender_thread = threading.Thread(target=self.run_sender, daemon=True)
+        self.sender_thread.start()
+
     def run(self):
         host = input('Enter the server IP to connect: ').strip()
         port = input('Enter the server port to connect: ').strip()
+        room_id = input('Enter the room to join (empty for default): ').strip()
         self.host = host
         self.port = int(port)
+        self.room_id = room_id or DEFAULT_ROOM
         self.remote_server = ServerProxy(f"http://{self.host}:{self.port}/", allow_none=True)
         self.register()
 
@@ -81,10 +121,64 @@ class Client:
         pygame.display.set_caption(f"Othello-Client-RPC, Listening on: {self.callback_address}, Calling on: http://{self.host}:{self.port}")
 
         while self.RUN:
+            self.process_inbox()
             self.input()
             self.draw()
             self.clock.tick(60)
 
+        self.close()
+
+    def process_inbox(self):
+        """Handles every message received since the last frame, on the main thread."""
+        try:
+            while True:
+                self.handle_message(self.inbox.get_nowait())
+        except queue.Empty:
+            pass
+
+    def next_outgoing(self, pending):
+        """
+        Takes the next message to send, merging chat lines queued back to back
+        into a single CHAT message so a burst costs one call.
+        """
+        message = pending.pop() if pending else self.outbox.get()
+        if message is None or message.get('type') != MessageType.CHAT.value:
+            return message
+        lines = list(message['lines'])
+        while len(lines) < self.CHAT_BATCH_LINES:
+            try:
+                following = self.outbox.get_nowait()
+            except queue.Empty:
+                break
+            if following is None or following.get('type') != MessageType.CHAT.value:
+                pending.append(following)
+                break
+            lines.extend(following['lines'])
+        return {**message, "lines": lines}
+
+    def run_sender(self):
+        """Sends queued messages; refusals come back through the inbox as ERROR messages."""
+        pending = []
+        while (message := self.next_outgoing(pending)) is not None:
+            try:
+                response = self.remote_server.send_message(self.current_player, json.dumps(message), self.room_id, self.token)
+            except (OSError, XMLRPCError) as error:
+                print(f"Error sending message: {error!r}")
+                self.inbox.put({"type": MessageType.ERROR.value, "reason": "connection_error", "request": message})
+                continue
+            try:
+                response = json.loads(response)
+            except (TypeError, json.JSONDecodeError):
+                continue
+            if response.get('type') == MessageType.ERROR.value:
+                self.inbox.put({**response, "request": message})
+
+    def close(self):
+        """Lets the sender flush what is still queued (e.g. the give up on exit)."""
+        if self.sender_thread:
+            self.outbox.put(None)
+            self.sender_thread.join(timeout=2)
+
     def receive_messages(self):
         try:
             while self.RUN:
@@ -101,35 +195,45 @@ class Client:
         finally:
             self.socket.close()
     
-    def send_move(self, x, y):
+    def send(self, message):
+        """Queues a message for the sender thread; never blocks the frame."""
+        self.outbox.put(message)
+
+    def send_move(self, x, y, seq):
         message = {
             "type": MessageType.MOVE.value,
             "x": x,
-            "y": y
+            "y": y,
+            "seq": seq
         }
-        self.remote_server.send_message(self.current_player, json.dumps(message))
+        self.send(message)
     
     def send_message_chat(self, content):
         message = {
             "type": MessageType.CHAT.value,
-            "content": content,
-            "player": self.current_player * -1
+            "lines": [content]
         }
-        self.remote_server.send_message(self.current_player, json.dumps(message))
+        self.send(message)
 
     def send_give_up(self, rival_status):
         message = {
             "type": MessageType.GIVE_UP.value,
             "rival_status": rival_status
         }
-        self.remote_server.send_message(self.current_player, json.dumps(message))
+        self.send(message)
         self.game_over = True
 
+    def send_hint(self):
+        message = {
+            "type": MessageType.HINT.value,
+        }
+        self.send(message)
+
     def send_restart(self):
         message = {
             "type": MessageType.RESTART.value,
         }
-        self.remote_server.send_message(self.current_player, json.dumps(message))
+        self.send(message)
 
     def process_setup(self, message):
         current_player = message.get('current_player')
@@ -139,7 +243,10 @@ class Client:
 
         self.current_player = current_player
         self.rival_status = rival_status
-        self.turn = -1
+        self.turn = message.get('turn', -1)
+        if token := message.get('token'):
+            self.token = token
+        self.pending_moves.clear()
         self.white_score = 2
         self.black_score = 2
 
@@ -148,21 +255,36 @@ class Client:
         if self.rival_status == PlayerStatusType.CONNECTED.value:
             rival_status = ''
         
-        if self.current_player == 1:
+        if self.is_spectator():
+            self.white_score_text = 'white'
+            self.black_score_text = 'black'
+        elif self.current_player == 1:
             self.white_score_text = 'white # YOU'
             self.black_score_text = 'black ' + rival_status
         else: 
             self.black_score_text = 'black # YOU'
             self.white_score_text = 'white ' + rival_status
 
-        self.grid.tokens.clear()
+        self.grid.clear_tokens()
         grid_logic = message.get('grid')
-        self.update(grid_logic, -1)
+        self.update(grid_logic, self.turn)
         self.game_over = False
+        self.process_clocks(message)
+
+    def process_clocks(self, message):
+        if 'clocks' in message:
+            self.clocks = message.get('clocks')
+            self.clocks_received_at = time.monotonic()
 
     def process_update(self, message):
+        self.process_clocks(message)
         grid_logic = message.get('grid')
         turn = message.get('turn')
+        if message.get('player') == self.current_player:
+            pending = self.pending_moves.pop(message.get('seq'), None)
+            if pending and pending[:2] == (grid_logic, turn):
+                self.info_text = ''
+                return  # previsão confirmada: nada a redesenhar
         self.update(grid_logic, turn)
 
     def process_rival_connected(self, message):
@@ -177,19 +299,47 @@ class Client:
             self.black_score_text = 'black # YOU'
             self.white_score_text = 'white '
         
-        self.grid.tokens.clear()
+        self.grid.clear_tokens()
+        self.pending_moves.clear()
         grid_logic = message.get('grid')
         self.update(grid_logic, -1)
         self.game_over = False
         self.rival_status = PlayerStatusType.CONNECTED.value
+        self.process_clocks(message)
         # self.chat_history.append(['i', f'[INFO] rival CONNECTED'])
     
     def process_chat(self, message):
-        content = message.get('content')
-        self.chat_history.append(['r', content])
+        # o servidor agrupa rajadas de mensagens em uma única entrega
+        for content in message.get('lines') or [message.get('content')]:
+            self.chat_history.append(['r', content])
     
-    def process_gamer_over(self):
+    def process_hint(self, message):
+        if self.turn == self.current_player:
+            self.hints = message.get('moves', [])
+
+    def process_error(self, message):
+        reason = message.get('reason')
+        retry_after = message.get('retry_after', 0)
+        self.info_text = f'[{reason}] retry in {retry_after:.1f}s' if retry_after else f'[{reason}]'
+
+        request = message.get('request') or {}
+        if request.get('type') == MessageType.MOVE.value:
+            # O servidor recusou a jogada: desfaz no tabuleiro local
+            if pending := self.pending_moves.pop(request.get('seq'), None):
+                self.rollback(*pending[2:])
+
+    def process_gamer_over(self, message):
         self.game_over = True
+        self.process_clocks(message)
+        if message.get('reason') == 'timeout':
+            # quem estourou o relógio perde, qualquer que seja o placar
+            if message.get('player') == 1:
+                self.white_score_text += ' TIMEOUT'
+                self.black_score_text += ' WON!'
+            else:
+                self.black_score_text += ' TIMEOUT'
+                self.white_score_text += ' WON!'
+            return
         if self.white_score > self.black_score:
                 self.white_score_text += ' WON!'
                 self.black_score_text += ' LOST!'
@@ -205,11 +355,13 @@ class Client:
     def process_give_up(self, message):
         self.game_over = True
         rival_status = message.get('rival_status')
+        # espectadores recebem quem desistiu, jogadores sabem que foi o rival
+        loser = message.get('player', self.current_player * -1)
 
-        if rival_status == PlayerStatusType.DISCONNECTED.value:
+        if rival_status == PlayerStatusType.DISCONNECTED.value and not self.is_spectator():
             self.rival_status = rival_status
 
-        if self.current_player == -1:
+        if loser == 1:
             self.black_score_text += ' WON!'
             self.white_score_text += ' ' + rival_status
         else:
@@ -233,14 +385,23 @@ class Client:
             self.process_chat(message)
 
         elif message_type == MessageType.GAME_OVER.value:
-            self.process_gamer_over()
+            self.process_gamer_over(message)
         
         elif message_type == MessageType.GIVE_UP.value:
             self.process_give_up(message)
 
+        elif message_type == MessageType.HINT.value:
+            self.process_hint(message)
+
+        elif message_type == MessageType.ERROR.value:
+            self.process_error(message)
+
         else:
             print("Unknown message type", message)
     
+    def is_spectator(self):
+        return self.current_player == 0
+
     def get_server_address(self):
         host = input('Enter the server IP to connect: ').strip()
         port = input('Enter the server port to connect: ').strip()
@@ -250,8 +411,12 @@ class Client:
     def input(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                self.send_give_up(PlayerStatusType.DISCONNECTED.value)
+                if not self.is_spectator():
+                    self.send_give_up(PlayerStatusType.DISCONNECTED.value)
                 self.RUN = False
+
+            if self.is_spectator():
+                continue
             
             if event.type == pygame.TEXTINPUT:
                 if len(self.INPUT_TEXT) < 19:
@@ -261,6 +426,8 @@ class Client:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_BACKSPACE:
                     self.INPUT_TEXT = self.INPUT_TEXT[:-1]
+                if event.key == pygame.K_TAB and self.turn == self.current_player and not self.game_over:
+                    self.send_hint()
                 if event.key == pygame.K_RETURN and self.INPUT_TEXT != '':
                     self.send_message_chat(self.INPUT_TEXT)
                     self.chat_history.append(["s", self.INPUT_TEXT])
@@ -290,36 +457,52 @@ class Client:
                             x, y = (x - 80) // 80, (y - 80) // 80
                             if valid_cells := self.grid.find_available_moves(self.grid.logic_grid, self.turn):
                                 if (y, x) in valid_cells:
+                                    previous_grid = [row[:] for row in self.grid.logic_grid]
+                                    self.hints = []
                                     self.grid.insert_token(self.grid.logic_grid, self.turn, y, x)
                                     swappable_tiles = self.grid.get_swappable_tiles(y, x, self.grid.logic_grid, self.turn)
                                     for tile in swappable_tiles:
                                         self.grid.animate_transitions(tile, self.turn)
                                         self.grid.logic_grid[tile[0]][tile[1]] *= -1
                                     
-                                    self.send_move(x, y)
+                                    previous_turn = self.turn
                                     self.turn *= -1
                                     self.process_score()
+
+                                    # Guarda a previsão e o estado anterior para confirmar ou desfazer
+                                    self.move_seq += 1
+                                    self.pending_moves[self.move_seq] = (
+                                        [row[:] for row in self.grid.logic_grid], self.turn, previous_grid, previous_turn
+                                    )
+                                    self.send_move(x, y, self.move_seq)
+
+    def rollback(self, logic_grid, turn):
+        """Restores the board from before a move the server refused."""
+        self.update(logic_grid, turn)
                 
     def update(self, logic_grid, turn):
-        self.grid.logic_grid = logic_grid  # Atualiza o grid com a nova lógica
-
-        # Percorre o logic_grid
-        for y in range(len(logic_grid)):        # Percorre as linhas
-            for x in range(len(logic_grid[y])):  # Percorre as colunas
-                if logic_grid[y][x] != 0:  # Verifica se o valor na posição (y, x) não é 0
-                    player = logic_grid[y][x]  # Define o jogador (-1 ou 1)
-                    # Chama a função insertToken com o jogador e as coordenadas
-                    self.grid.insert_token(self.grid.logic_grid, player, y, x)
-                    
+        # Atualiza só as casas que mudaram, reaproveitando as peças das demais
+        self.grid.apply_grid(logic_grid)
+        self.hints = []
+
         self.turn = turn
         self.process_score()
         
     def process_score(self):
         self.white_score, self.black_score, count_zeros = self.grid.calculate_score()
             
+    def render_text(self, text, color):
+        key = (text, color)
+        if (text_as_image := self.text_cache.get(key)) is None:
+            text_as_image = self.text_cache[key] = self.FONT.render(text, True, color)
+            if len(self.text_cache) > self.TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return text_as_image
+
     def draw_text(self, text, x, y, color=(250, 250, 250)):
-        text_as_image = self.FONT.render(text, True, color)
-        self.screen.blit(text_as_image, (x, y))
+        self.screen.blit(self.render_text(text, color), (x, y))
     
     def draw_chat(self):
         # Draw the chat box
@@ -329,16 +512,38 @@ class Client:
         self.draw_text('chat', 800, 175)
         y = 670
         # Pegando as últimas 14 entradas do chat_history, de trás para frente
-        for type, content in reversed(self.chat_history[-14:]):
+        for type, content in islice(reversed(self.chat_history), 14):
             if type == 'r':
                 self.draw_text(content, 805, y)
-            # elif type == 'i':
-            #     self.draw_text(content, 805, y, (180, 180, 0))
+            elif type == 'i':
+                self.draw_text(content, 805, y, (180, 180, 0))
             else: self.draw_text(content, 805, y, (30, 120, 30))
             y -= 35 # espaco entre cada msg
         # Draw input text
         self.draw_text(self.INPUT_TEXT, 805, 725)
 
+    def draw_hints(self):
+        # Nota de cada jogada sugerida, a melhor em verde
+        for i, hint in enumerate(self.hints):
+            color = (30, 160, 30) if i == 0 else (200, 200, 200)
+            self.draw_text(str(hint['score']), 80 + hint['x'] * 80 + 4, 80 + hint['y'] * 80 + 2, color)
+
+    def get_clock_left(self, player):
+        key = 'white' if player == 1 else 'black'
+        left = self.clocks[key]
+        # o servidor só manda os relógios a cada jogada; desconta aqui o tempo do lance em andamento
+        if player == self.turn and not self.game_over:
+            left -= time.monotonic() - self.clocks_received_at
+        return max(0.0, left)
+
+    def draw_clocks(self):
+        if not self.clocks:
+            return
+        for player, y in ((1, 60), (-1, 95)):
+            minutes, seconds = divmod(self.get_clock_left(player), 60)
+            color = (250, 250, 250) if player == self.turn and not self.game_over else (120, 120, 120)
+            self.draw_text(f'{int(minutes)}:{seconds:04.1f}', 985, y, color)
+
     def draw_game_over(self):
         if self.game_over:
             pygame.draw.rect(self.screen, (30, 120, 30), (800, 130, 250, 30))
@@ -354,12 +559,15 @@ class Client:
 
         # Draw the grid
         self.grid.draw_grid(self.screen)
+        self.draw_hints()
 
         # Draw score
         self.draw_text(f'{self.white_score}: {self.white_score_text}', 800, 60)
         self.draw_text(f'{self.black_score}: {self.black_score_text}', 800, 95)
+        self.draw_text(self.info_text, 800, 20, (180, 180, 0))
+        self.draw_clocks()
 
-        if self.rival_status == PlayerStatusType.CONNECTED.value:
+        if self.rival_status == PlayerStatusType.CONNECTED.value and not self.is_spectator():
             # Draw chat history
             self.draw_chat()
 
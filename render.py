@@ -0,0 +1,63 @@
+import argparse
+import os
+import multiprocessing
+from collections import deque
+
+from app._class.GameArchive import GameArchive
+
+_renderer = None
+
+
+def init_worker(size):
+    # Cada processo carrega os assets uma única vez
+    global _renderer
+    from app._class.BoardRenderer import BoardRenderer
+    _renderer = BoardRenderer(size)
+
+
+def render_chunk(first_index, games, output_dir, frames):
+    for index, moves in enumerate(games, first_index):
+        name = os.path.join(output_dir, f"game-{index:06d}")
+        if frames:
+            _renderer.save_game(moves, name)
+        else:
+            _renderer.save_final_position(moves, f"{name}.png")
+    return len(games)
+
+
+def export(paths, output_dir, size=200, frames=False, workers=None, chunk_size=200):
+    """
+    Renders every game of the archives with a process pool: the final position
+    as `game-NNNNNN.png`, or with `frames` every position as
+    `game-NNNNNN-PPP.png`. Returns the number of games rendered.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    rendered = 0
+    index = 0
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=(size,)) as pool:
+        in_flight = deque()
+        for chunk in GameArchive.read_chunks(paths, chunk_size):
+            in_flight.append(pool.apply_async(render_chunk, (index, chunk, output_dir, frames)))
+            index += len(chunk)
+            if len(in_flight) >= workers * 2:
+                rendered += in_flight.popleft().get()
+        while in_flight:
+            rendered += in_flight.popleft().get()
+        pool.close()
+        pool.join()
+    return rendered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render games from archives written by the server to PNG images.")
+    parser.add_argument('archives', nargs='+', help="archive files written with server.py --archive")
+    parser.add_argument('--out', default='renders', help="directory for the images")
+    parser.add_argument('--size', type=int, default=200, help="image width and height in pixels (800 is full size)")
+    parser.add_argument('--frames', action='store_true', help="write every position of each game instead of the final one")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=200, help="games per task sent to a worker")
+    args = parser.parse_args()
+
+    count = export(args.archives, args.out, args.size, args.frames, args.workers, args.chunk_size)
+    print(f"{count} games rendered to {args.out}/")
@@ -1,204 +1,91 @@
-import socket
+import argparse
+import signal
 import threading
-import json
+import multiprocessing
+import socketserver
 
 from app.utils.socket import get_local_LAN_ip
-from app.enums.message import MessageType, PlayerStatusType
 
-from app._class.Grid import LogicGrid
+from app._class.RPCServer import RPCServer
+from app._class.Shard import ShardRouter
 
 from xmlrpc.server import SimpleXMLRPCServer
-from xmlrpc.server import SimpleXMLRPCRequestHandler
-from xmlrpc.client import ServerProxy
-import threading
 
-class RPCServer:
-    def __init__(self, host='0.0.0.0', port=8000):
-        self.lock = threading.Lock()
-        self.host = host
-        self.port = port
-
-        self.conn_white = None
-        self.conn_black = None
-
-        self.grid = LogicGrid(8, 8)
-        self.turn = -1
-        self.game_over = False
-        self.white_score = 2
-        self.black_score = 2
-
-    def register(self, callback_address):
-        """
-        Registra o cliente como 1 ou -1.
-        """
-        with self.lock: # thread-safe
-            if self.conn_white is None:
-                self.conn_white = ServerProxy(callback_address)
-                return self.get_setup(1)
-            elif self.conn_black is None:
-                self.conn_black = ServerProxy(callback_address)
-                return self.get_setup(-1)
-            else:
-                return 0  # Não há espaço para mais clientes
-
-    def send_message(self, sender, message):
-        """
-        Recebe a mensagem de um cliente e a encaminha ao outro.
-        """
-        if sender == 1:
-            recipient_conn = self.conn_black  # O destinatário é o cliente -1
-            client = 1
-        else:
-            recipient_conn = self.conn_white  # O destinatário é o cliente 1
-            client = -1
-
-        if recipient_conn is not None:
-            try:
-                data = json.loads(message)
-                self.handle_message(data, sender)  # Processa a mensagem
-            except (BrokenPipeError, ConnectionResetError):
-                print(f"Connection error with recipient client {client}.")
-            except json.JSONDecodeError:
-                print("Error decoding the JSON message.")
-        return f"Client {client} not connected."
-    
-    def send_message_to(self, message, client):
-        if conn := self.conn_white if client == 1 else self.conn_black:
-            try:
-                conn.receive_message(json.dumps(message))
-            except (BrokenPipeError, ConnectionResetError, ConnectionRefusedError):
-                print(f"Connection error with client {client}. Removing client.")
-                self.handle_disconnection(client)
-
-    def get_setup(self, client):
-        rival_status = PlayerStatusType.CONNECTED.value if (
-            self.conn_white if client == -1 else self.conn_black
-        ) else PlayerStatusType.DISCONNECTED.value
-
-        message = {
-            "type": MessageType.SETUP.value,
-            "current_player": client, 
-            "grid": self.grid.logic_grid, 
-            "turn": -1,
-            "rival_status": rival_status
-        }
-
-        if client == 1 and self.conn_black != None:
-            self.send_rival_connected(-1)
-        elif client == -1 and self.conn_white != None:
-            self.send_rival_connected(1)
-
-        return json.dumps(message)
-    
-    def send_setup(self, client):
-        setup = self.get_setup(client)
-        self.send_message_to(json.loads(setup), client)
-
-    def send_update(self):
-        message = {
-            "type": MessageType.UPDATE.value,
-            "grid": self.grid.logic_grid,
-            "turn": self.turn
-        }
-        self.send_message_to(message, self.turn)
-    
-    def send_rival_connected(self, client):
-        message = {
-            "type": MessageType.RIVAL_CONNECTED.value,
-            "grid": self.grid.logic_grid,
-        }
-        self.send_message_to(message, client)
-
-    def send_game_over(self):
-        message = {
-            "type": MessageType.GAME_OVER.value,
-        }
-        self.send_message_to(message, 1)
-        self.send_message_to(message, -1)
-
-    def process_move(self, message):
-        x = message.get('x')
-        y = message.get('y')
-        if valid_cells := self.grid.find_available_moves(self.grid.logic_grid, self.turn):
-            if (y, x) in valid_cells:
-                self.grid.insert_token(self.grid.logic_grid, self.turn, y, x)
-                swappable_tiles = self.grid.get_swappable_tiles(y, x, self.grid.logic_grid, self.turn)
-                for tile in swappable_tiles:
-                    self.grid.logic_grid[tile[0]][tile[1]] *= -1
-                self.turn *= -1
-                self.send_update()
-
-                if not self.grid.find_available_moves(self.grid.logic_grid, self.turn):
-                    self.game_over = True
-                    self.send_game_over()
-    
-    def process_chat(self, message):
-        content = message.get('content')
-        client = message.get('player')
-        message = {
-        "type": MessageType.CHAT.value,
-        "content": content, 
-        }
-        self.send_message_to(message, client)
-
-    def process_restart(self):
-        self.grid.reset_logic_grid()
-        self.turn = -1
-        self.game_over = False
-        self.send_setup(1)
-        self.send_setup(-1)
-    
-    def process_give_up(self, client, message):
-        rival_status = message.get('rival_status')
-        message = {
-            "type": MessageType.GIVE_UP.value,
-            "rival_status": rival_status
-        }
-        if rival_status == PlayerStatusType.DISCONNECTED.value:
-            return self.handle_disconnection(client)
-        self.send_message_to(message, client*-1)
-
-    def handle_disconnection(self, client):
-        self.grid.reset_logic_grid()
-        self.turn = -1
-        self.game_over = False
-        if client == 1:
-            self.conn_white = None
-        else: self.conn_black = None
-
-        self.send_message_to({"type": MessageType.GIVE_UP.value, "rival_status": PlayerStatusType.DISCONNECTED.value}, client*-1)
-
-    def handle_message(self, message, client):
-        message_type = message.get('type')
-        
-        if message_type == MessageType.MOVE.value:
-            self.process_move(message)
-
-        elif message_type == MessageType.CHAT.value:
-            self.process_chat(message)
-        
-        elif message_type == MessageType.RESTART.value:
-            self.process_restart()
-        
-        elif message_type == MessageType.GIVE_UP.value:
-            self.process_give_up(client, message)
-
-        else:
-            print("Unknown message type", message)
-
-    def run(self):
-        port = input("Enter the server port:").strip()
-        self.port = int(port)
-
-        with SimpleXMLRPCServer((self.host, self.port), allow_none=True) as server:
-            # server.register_instance(self)
-            server.register_function(self.register, 'register')
-            server.register_function(self.send_message, 'send_message')
-
-            print(f"Othello-RPC-Server Running: {get_local_LAN_ip()}:{self.port}")
-            
-            server.serve_forever()
+
+class ThreadingXMLRPCServer(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+
+def run_shard(port, archive_path=None, time_control=None, profile_dir='profiles', snapshot_path=None, restore=False):
+    RPCServer('127.0.0.1', port, archive_path=archive_path, time_control=time_control,
+              profile_dir=profile_dir, snapshot_path=snapshot_path).serve(restore)
+
+
+def run_sharded(host, port, shards, archive_path=None, time_control=None, profile_dir='profiles', snapshot_path=None,
+                restore=False):
+    """
+    Starts `shards` worker processes on the ports following `port`, each owning
+    the rooms mapped to it on the hash ring, behind a routing front-end on `port`.
+    Each shard keeps its own snapshot, `<snapshot_path>.<shard>`; restoring
+    with the same number of shards puts every room back on its shard.
+    add_shard/remove_shard are served on 127.0.0.1, ADMIN_PORT_OFFSET above `port`.
+    """
+    workers = []
+    for i in range(1, shards + 1):
+        shard_snapshot = f"{snapshot_path}.{i}" if snapshot_path else None
+        worker = multiprocessing.Process(target=run_shard, daemon=True,
+                                         args=(port + i, archive_path, time_control, profile_dir, shard_snapshot, restore))
+        worker.start()
+        workers.append(worker)
+
+    router = ShardRouter([(f"http://127.0.0.1:{port + i}/", f"http://127.0.0.1:{port + i + RPCServer.ADMIN_PORT_OFFSET}/")
+                          for i in range(1, shards + 1)])
+    # O roteador atende cada chamada em sua própria thread para não serializar os shards
+    with ThreadingXMLRPCServer((host, port), allow_none=True, logRequests=False) as server:
+        server.register_function(router.register, 'register')
+        server.register_function(router.send_message, 'send_message')
+        server.register_function(router.watch, 'watch')
+        server.register_function(router.get_metrics, 'metrics')
+
+        admin = SimpleXMLRPCServer(('127.0.0.1', port + RPCServer.ADMIN_PORT_OFFSET), allow_none=True, logRequests=False)
+        admin.register_function(router.add_shard, 'add_shard')
+        admin.register_function(router.remove_shard, 'remove_shard')
+        threading.Thread(target=admin.serve_forever, daemon=True).start()
+
+        # SIGTERM/SIGINT: para de rotear e deixa cada shard salvar o próprio snapshot
+        def request_shutdown(signum, frame):
+            threading.Thread(target=server.shutdown, daemon=True).start()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, request_shutdown)
+
+        print(f"Othello-RPC-Router Running: {get_local_LAN_ip()}:{port} ({shards} shards)")
+
+        server.serve_forever()
+        admin.shutdown()
+        admin.server_close()
+
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        worker.join()
 
 if __name__ == "__main__":
-    server = RPCServer()
-    server.run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shards', type=int, default=0, help="number of worker processes (0 runs a single process)")
+    parser.add_argument('--archive', help="append every finished game to this archive file")
+    parser.add_argument('--base-time', type=float, default=0, help="seconds on each player's clock (0 disables clocks)")
+    parser.add_argument('--increment', type=float, default=0, help="seconds added to a player's clock after each move")
+    parser.add_argument('--snapshot', help="on SIGTERM/SIGINT, save the live rooms to this file")
+    parser.add_argument('--restore', action='store_true', help="load the rooms saved in --snapshot at startup")
+    parser.add_argument('--profile-dir', default='profiles', help="where profiles requested with SIGUSR1 or the profile RPC are written")
+    args = parser.parse_args()
+    time_control = (args.base_time, args.increment) if args.base_time > 0 else None
+
+    if args.shards:
+        port = int(input("Enter the server port:").strip())
+        run_sharded('0.0.0.0', port, args.shards, args.archive, time_control, args.profile_dir, args.snapshot,
+                    args.restore)
+    else:
+        server = RPCServer(archive_path=args.archive, time_control=time_control, profile_dir=args.profile_dir,
+                           snapshot_path=args.snapshot)
+        server.run(args.restore)
@@ -0,0 +1,200 @@
+import unittest
+
+from app.enums.message import MessageType, PlayerStatusType
+from app._class.Harness import Harness
+from app._class.Grid import LogicGrid
+
+UPDATE = MessageType.UPDATE.value
+SETUP = MessageType.SETUP.value
+GAME_OVER = MessageType.GAME_OVER.value
+GIVE_UP = MessageType.GIVE_UP.value
+CHAT = MessageType.CHAT.value
+HINT = MessageType.HINT.value
+RIVAL_CONNECTED = MessageType.RIVAL_CONNECTED.value
+
+INITIAL_GRID = LogicGrid(8, 8).logic_grid
+
+
+def reason(error):
+    return error["reason"]
+
+
+class SetupTest(unittest.TestCase):
+    def test_first_two_clients_are_seated(self):
+        harness = Harness()
+        first = harness.client()
+        setup = first.register()
+        self.assertEqual(setup["type"], SETUP)
+        self.assertEqual(setup["current_player"], 1)
+        self.assertEqual(setup["grid"], INITIAL_GRID)
+        self.assertEqual(setup["rival_status"], PlayerStatusType.DISCONNECTED.value)
+
+        second = harness.client()
+        setup = second.register()
+        self.assertEqual(setup["current_player"], -1)
+        self.assertEqual(setup["rival_status"], PlayerStatusType.CONNECTED.value)
+        self.assertEqual(len(first.received(RIVAL_CONNECTED)), 1)
+
+    def test_third_client_watches(self):
+        harness = Harness()
+        harness.pair()
+        spectator = harness.client()
+        self.assertIsNone(spectator.register())
+        snapshot = spectator.watch()
+        self.assertEqual(snapshot["current_player"], 0)
+        self.assertEqual(snapshot["grid"], INITIAL_GRID)
+
+    def test_rooms_are_independent(self):
+        harness = Harness()
+        white, black = harness.pair("a")
+        other_white, other_black = harness.pair("b")
+        self.assertIsNone(harness.play(white, black, [(2, 3)]))
+        self.assertEqual(other_white.received(UPDATE), [])
+        self.assertEqual(harness.room("b").turn, -1)
+
+
+class MoveTest(unittest.TestCase):
+    def setUp(self):
+        self.harness = Harness()
+        self.white, self.black = self.harness.pair()
+        self.white.received()
+
+    def test_move_is_sent_to_both_players(self):
+        self.assertIsNone(self.harness.play(self.white, self.black, [(2, 3)]))
+        for client in (self.white, self.black):
+            update = client.received(UPDATE)[-1]
+            self.assertEqual(update["turn"], 1)
+            self.assertEqual(update["player"], -1)
+            self.assertEqual(update["seq"], 1)
+            self.assertEqual(update["grid"][3][2:5], [-1, -1, -1])
+
+    def test_black_moves_first(self):
+        self.harness.advance(1)
+        self.assertEqual(reason(self.white.move(2, 4)), "not_your_turn")
+
+    def test_illegal_move_is_refused(self):
+        self.harness.advance(1)
+        for x, y in ((0, 0), (3, 3), (9, 2), (None, 2)):
+            self.assertEqual(reason(self.black.move(x, y)), "illegal_move")
+        self.assertEqual(self.white.received(UPDATE), [])
+
+    def test_game_played_to_the_end(self):
+        moves = self.harness.play_random(self.white, self.black)
+        self.assertTrue(self.harness.room().game_over)
+        self.assertEqual(self.harness.room().move_log, moves)
+        self.assertEqual(len(self.white.received(GAME_OVER)), 1)
+        self.assertEqual(len(self.black.received(GAME_OVER)), 1)
+
+    def test_hint_lists_every_legal_move(self):
+        self.harness.advance(1)
+        self.assertIsNone(self.black.hint())
+        hint = self.black.last(HINT)
+        self.assertEqual(sorted((move["x"], move["y"]) for move in hint["moves"]),
+                         [(2, 3), (3, 2), (4, 5), (5, 4)])
+
+
+class GiveUpTest(unittest.TestCase):
+    def setUp(self):
+        self.harness = Harness()
+        self.white, self.black = self.harness.pair()
+        self.spectator = self.harness.join()
+        self.harness.play(self.white, self.black, [(2, 3)])
+        for client in (self.white, self.black, self.spectator):
+            client.received()
+
+    def test_give_up_ends_the_game(self):
+        self.harness.advance(1)
+        self.assertIsNone(self.white.give_up())
+        self.assertEqual(self.black.received(GIVE_UP), [{"type": GIVE_UP, "rival_status": PlayerStatusType.GAVE_UP.value}])
+        self.assertEqual(self.spectator.received(GIVE_UP)[0]["player"], 1)
+        self.harness.advance(1)
+        self.assertEqual(reason(self.white.move(2, 2)), "not_your_turn")
+
+    def test_restart_resets_the_board(self):
+        self.harness.advance(1)
+        self.white.give_up()
+        self.harness.advance(1)
+        self.assertIsNone(self.black.restart())
+        for client in (self.white, self.black):
+            setup = client.last(SETUP)
+            self.assertEqual(setup["grid"], INITIAL_GRID)
+            self.assertEqual(setup["turn"], -1)
+        self.assertEqual(self.spectator.last(SETUP)["grid"], INITIAL_GRID)
+        self.assertIsNone(self.harness.play(self.white, self.black, [(2, 3)]))
+
+
+class DisconnectTest(unittest.TestCase):
+    def test_disconnect_frees_the_seat(self):
+        harness = Harness()
+        white, black = harness.pair()
+        harness.advance(1)
+        self.assertIsNone(white.disconnect())
+        self.assertEqual(black.received(GIVE_UP)[-1]["rival_status"], PlayerStatusType.DISCONNECTED.value)
+        replacement = harness.client()
+        self.assertEqual(replacement.register()["current_player"], 1)
+
+    def test_lone_player_leaving_removes_the_room(self):
+        harness = Harness()
+        alone = harness.join("lonely")
+        self.assertIsNone(alone.disconnect())
+        self.assertNotIn("lonely", harness.server.rooms)
+
+    def test_stale_token_is_refused(self):
+        harness = Harness()
+        white, black = harness.pair()
+        token = white.token
+        harness.advance(1)
+        white.disconnect()
+        harness.join()
+        white.token = token
+        harness.advance(1)
+        self.assertEqual(reason(white.give_up()), "unauthorized")
+
+
+class ClockTest(unittest.TestCase):
+    def setUp(self):
+        self.harness = Harness(time_control=(10, 2))
+        self.white, self.black = self.harness.pair()
+        self.spectator = self.harness.join()
+
+    def test_flag_falls_for_the_player_on_turn(self):
+        self.harness.advance(9.9)
+        self.assertEqual(self.white.received(GAME_OVER), [])
+        self.harness.advance(0.2)
+        for client in (self.white, self.black, self.spectator):
+            game_over = client.last(GAME_OVER)
+            self.assertEqual(game_over["reason"], "timeout")
+            self.assertEqual(game_over["player"], -1)
+            self.assertEqual(game_over["clocks"]["black"], 0)
+        self.assertTrue(self.harness.room().game_over)
+
+    def test_increment_is_added_after_a_move(self):
+        self.harness.play(self.white, self.black, [(2, 3)], move_time=3)
+        clocks = self.white.last(UPDATE)["clocks"]
+        self.assertEqual(clocks, {"white": 10, "black": 9})
+
+
+class SpectatorTest(unittest.TestCase):
+    def test_spectators_follow_the_game(self):
+        harness = Harness()
+        white, black = harness.pair()
+        spectators = [harness.join() for _ in range(3)]
+        harness.play(white, black, [(2, 3), (2, 2)])
+        for spectator in spectators:
+            updates = spectator.received(UPDATE)
+            self.assertEqual([update["player"] for update in updates], [-1, 1])
+            self.assertEqual(updates[-1]["grid"], harness.room().grid.logic_grid)
+
+    def test_spectators_do_not_receive_chat(self):
+        harness = Harness()
+        white, black = harness.pair()
+        spectator = harness.join()
+        harness.advance(1)
+        self.assertIsNone(white.chat("good luck", "have fun"))
+        harness.advance(harness.room().CHAT_BATCH_WINDOW)
+        self.assertEqual(black.received(CHAT), [{"type": CHAT, "lines": ["good luck", "have fun"]}])
+        self.assertEqual(spectator.received(CHAT), [])
+
+
+if __name__ == "__main__":
+    unittest.main()